@@ -0,0 +1,406 @@
+"""Async HTTP API for plan generation and PDF export, alongside the Streamlit UI.
+
+Run with:
+
+    uvicorn api:app --host 0.0.0.0 --port 8000
+
+Set PLANNER_STUB_MODEL=1 to serve canned plans for local load tests.
+"""
+import asyncio
+import contextlib
+import json
+import os
+
+from dotenv import load_dotenv
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.exceptions import HTTPException
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+import planner
+from pdf_generator import PLAN_PDF_KINDS, cached_plan_pdf, format_user_details, personal_info_for, render_plan_pdf
+from plan_store import PLAN_TYPES, get_repository, profile_hash
+
+# Concurrent model generations, and how many more requests may wait for a slot
+# before new ones are turned away with 503 (API_MAX_CONCURRENCY, API_MAX_WAITING)
+MAX_CONCURRENCY = 16
+MAX_WAITING = 64
+# PDF rendering is CPU-bound, so it gets a smaller limit of its own (API_MAX_PDF_CONCURRENCY)
+MAX_PDF_CONCURRENCY = 4
+CACHED_CHUNK_CHARS = 1024
+# Longer names are cut off on the PDF title page
+MAX_NAME_CHARS = 80
+# Longer free-text fields are cut off before they reach prompts and the request log
+MAX_TEXT_CHARS = 500
+RETRY_AFTER_SECONDS = "5"
+
+# Sidebar inputs: (name, type, allowed values or (min, max))
+REQUIRED_FIELDS = [
+    ('age', int, (15, 100)),
+    ('gender', str, ["Male", "Female", "Other"]),
+    ('height', int, (100, 250)),
+    ('weight', int, (30, 250)),
+    ('activity_level', str, planner.ACTIVITY_LEVELS),
+    ('diet_goal', str, planner.DIET_GOALS),
+    ('fitness_goal', str, planner.FITNESS_GOALS),
+]
+OPTIONAL_FIELDS = [
+    ('dietary_restrictions', str, planner.DIET_TYPES),
+    ('food_preferences', str, None),
+    ('allergies', list, None),
+    ('meals_per_day', int, (3, 6)),
+    ('available_equipment', list, None),
+    ('time_available', int, (15, 120)),
+    ('exercise_experience', str, planner.EXPERIENCE_LEVELS),
+    ('exercise_preferences', list, None),
+    ('medical_conditions', str, None),
+    ('medications', str, None),
+    ('injuries', str, None),
+]
+
+
+class Overloaded(Exception):
+    """Raised when the wait queue for model work is full"""
+
+
+class ConcurrencyLimiter:
+    """Caps concurrent work and rejects new requests once too many are waiting"""
+
+    def __init__(self, limit, max_waiting):
+        self.limit = limit
+        self.max_waiting = max_waiting
+        self.pending = 0
+        self._semaphore = asyncio.Semaphore(limit)
+
+    def reserve(self):
+        """Take a place in the queue, or raise Overloaded if it is full
+
+        Check and increment happen without an await in between, so concurrent
+        requests cannot all pass the check before any of them is counted.
+        Pair with reserved().
+        """
+        if self.pending >= self.limit + self.max_waiting:
+            raise Overloaded()
+        self.pending += 1
+
+    @contextlib.asynccontextmanager
+    async def reserved(self):
+        """Wait for a slot for work that already called reserve(), then free its place"""
+        try:
+            async with self._semaphore:
+                yield
+        finally:
+            self.pending -= 1
+
+    @contextlib.asynccontextmanager
+    async def slot(self):
+        self.reserve()
+        async with self.reserved():
+            yield
+
+
+class Generation:
+    """One in-flight plan generation, shared by every request for the same plan
+
+    Chunks are kept until the plan is saved, so clients that join late replay
+    the text from the start and then follow along.
+    """
+
+    def __init__(self):
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self.plan_id = None
+        self.task = None
+        self._changed = asyncio.Condition()
+
+    async def add(self, chunk):
+        self.chunks.append(chunk)
+        async with self._changed:
+            self._changed.notify_all()
+
+    async def finish(self, plan_id=None, error=None):
+        self.plan_id = plan_id
+        self.error = error
+        self.done = True
+        async with self._changed:
+            self._changed.notify_all()
+
+    async def follow(self):
+        """Yield every chunk, from the first, until the generation ends; re-raises its error"""
+        sent = 0
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(lambda: self.done or len(self.chunks) > sent)
+            while sent < len(self.chunks):
+                sent += 1
+                yield self.chunks[sent - 1]
+            if self.done and sent == len(self.chunks):
+                if self.error is not None:
+                    raise self.error
+                return
+
+    async def result(self):
+        """Wait for the generation to end and return the stored plan id"""
+        async with self._changed:
+            await self._changed.wait_for(lambda: self.done)
+        if self.error is not None:
+            raise self.error
+        return self.plan_id
+
+
+def parse_value(value, kind):
+    """Check a submitted value's JSON type and return it as kind, or raise ValueError"""
+    if kind is int:
+        # bool is an int subclass, and 30.9 must not silently become 30
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or \
+                (isinstance(value, float) and not value.is_integer()):
+            raise ValueError("must be an integer")
+        return int(value)
+    if kind is list:
+        # Multiselects are joined the same way the app does it
+        if isinstance(value, list) and all(isinstance(item, str) for item in value):
+            value = ', '.join(value)
+        elif not isinstance(value, str):
+            raise ValueError("must be a list of strings")
+    elif not isinstance(value, str):
+        raise ValueError("must be a string")
+    return value[:MAX_TEXT_CHARS]
+
+
+def parse_profile(payload):
+    """Validate a submitted profile and return (user_data, name)
+
+    Missing optional fields take the sidebar defaults, so a profile submitted
+    here hashes the same as the equivalent one entered in the Streamlit app.
+    """
+    if not isinstance(payload, dict):
+        raise HTTPException(422, "Expected a JSON object")
+    user_data = dict(planner.DEFAULT_USER_DATA)
+    errors = []
+    for fields, required in ((REQUIRED_FIELDS, True), (OPTIONAL_FIELDS, False)):
+        for name, kind, allowed in fields:
+            if name not in payload:
+                if required:
+                    errors.append(f"{name} is required")
+                continue
+            try:
+                value = parse_value(payload[name], kind)
+            except ValueError as e:
+                errors.append(f"{name} {e}")
+                continue
+            if isinstance(allowed, tuple) and not allowed[0] <= value <= allowed[1]:
+                errors.append(f"{name} must be between {allowed[0]} and {allowed[1]}")
+            elif isinstance(allowed, list) and value not in allowed:
+                errors.append(f"{name} must be one of: {', '.join(allowed)}")
+            else:
+                user_data[name] = value
+    name = payload.get('name', '')
+    if not isinstance(name, str):
+        errors.append("name must be a string")
+    if errors:
+        raise HTTPException(422, "; ".join(errors))
+    return user_data, name.strip()[:MAX_NAME_CHARS]
+
+
+def sse(event, data):
+    """Format one server-sent event with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def run_generation(app, key, plan_type, user_data, generation):
+    """Generate a plan into a shared Generation and store it"""
+    try:
+        async with app.state.limiter.reserved():
+            async for chunk in planner.stream_plan_async(plan_type, user_data):
+                await generation.add(chunk)
+        plan_id = await run_in_threadpool(app.state.repository.save_plan, key, plan_type, ''.join(generation.chunks))
+        await generation.finish(plan_id=plan_id)
+    except Exception as e:
+        await generation.finish(error=e)
+    finally:
+        # Only dropped once the plan is stored, so later requests find it there
+        del app.state.inflight[(key, plan_type)]
+
+
+def join_generation(app, key, plan_type, user_data):
+    """Return the in-flight generation of a plan, starting one if there is none
+
+    Raises Overloaded when a new generation would exceed the wait queue.
+    Runs without awaiting, so two requests can never both start the same plan.
+    """
+    generation = app.state.inflight.get((key, plan_type))
+    if generation is None:
+        app.state.limiter.reserve()
+        generation = Generation()
+        app.state.inflight[(key, plan_type)] = generation
+        # Runs to completion even if every client disconnects, so the plan is still stored
+        generation.task = asyncio.create_task(run_generation(app, key, plan_type, user_data, generation))
+    return generation
+
+
+async def submit_profile(request):
+    """POST /plans - submit a profile; returns its hash and which plans are ready"""
+    try:
+        payload = await request.json()
+    except ValueError:
+        raise HTTPException(400, "Invalid JSON body")
+    user_data, _ = parse_profile(payload)
+    repository = request.app.state.repository
+    key = profile_hash(user_data)
+    await run_in_threadpool(repository.log_request, key, user_data)
+
+    plans = {}
+    for plan_type in PLAN_TYPES:
+        plan_id = await run_in_threadpool(repository.find_plan_id, key, plan_type)
+        plans[plan_type] = "ready" if plan_id else "pending"
+    return JSONResponse({
+        'profile_hash': key,
+        'plans': plans,
+        'links': {
+            'stream': {plan_type: f"/plans/{key}/{plan_type}/stream" for plan_type in PLAN_TYPES},
+            'pdf': {kind: f"/plans/{key}/pdf/{kind}" for kind in PLAN_PDF_KINDS},
+        }
+    })
+
+
+async def stream_plan(request):
+    """GET /plans/{profile_hash}/{plan_type}/stream - plan text as server-sent events"""
+    key = request.path_params['profile_hash']
+    plan_type = request.path_params['plan_type']
+    if plan_type not in PLAN_TYPES:
+        raise HTTPException(404, f"Unknown plan type: {plan_type}")
+    repository = request.app.state.repository
+
+    plan_id = await run_in_threadpool(repository.find_plan_id, key, plan_type)
+    if plan_id is not None:
+        text = await run_in_threadpool(repository.load_plan, plan_id)
+
+        async def cached_events():
+            for start in range(0, len(text), CACHED_CHUNK_CHARS):
+                yield sse('chunk', text[start:start + CACHED_CHUNK_CHARS])
+            yield sse('done', {'plan_id': plan_id, 'cached': True})
+
+        events = cached_events()
+    else:
+        user_data = await run_in_threadpool(repository.get_profile, key)
+        if user_data is None:
+            raise HTTPException(404, "Unknown profile, submit it to POST /plans first")
+        # Joined or admitted before the stream starts, while a 503 can still be sent
+        generation = join_generation(request.app, key, plan_type, user_data)
+
+        async def generated_events():
+            try:
+                async for chunk in generation.follow():
+                    yield sse('chunk', chunk)
+                yield sse('done', {'plan_id': generation.plan_id, 'cached': False})
+            except Exception as e:
+                yield sse('error', {'detail': str(e)})
+
+        events = generated_events()
+
+    return StreamingResponse(events, media_type="text/event-stream",
+                             headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+def read_bytes(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def render_pdf_bytes(repository, kind, diet_plan_id, workout_plan_id, user_details):
+    """Render a one-off PDF and return its bytes, removing the file afterwards"""
+    pdf_path = render_plan_pdf(repository, kind, diet_plan_id, workout_plan_id, user_details)
+    try:
+        return read_bytes(pdf_path)
+    finally:
+        os.remove(pdf_path)
+
+
+async def plan_pdf(request):
+    """GET /plans/{profile_hash}/pdf/{kind}?name= - PDF bytes, generating plans if needed"""
+    key = request.path_params['profile_hash']
+    kind = request.path_params['kind']
+    if kind not in PLAN_PDF_KINDS:
+        raise HTTPException(404, f"Unknown PDF kind: {kind}")
+    repository = request.app.state.repository
+
+    user_data = await run_in_threadpool(repository.get_profile, key)
+    if user_data is None:
+        raise HTTPException(404, "Unknown profile, submit it to POST /plans first")
+
+    generations = {}
+    plan_ids = {}
+    for plan_type in PLAN_TYPES:
+        plan_ids[plan_type] = await run_in_threadpool(repository.find_plan_id, key, plan_type)
+        if plan_ids[plan_type] is None:
+            generations[plan_type] = join_generation(request.app, key, plan_type, user_data)
+    for plan_type, generation in generations.items():
+        try:
+            plan_ids[plan_type] = await generation.result()
+        except Exception as e:
+            raise HTTPException(502, f"Plan generation failed: {e}")
+
+    name = request.query_params.get('name', '').strip()[:MAX_NAME_CHARS]
+    user_details = format_user_details(personal_info_for(user_data, name))
+    async with request.app.state.pdf_limiter.slot():
+        if name:
+            # Every distinct name would be a new file and cache entry, so
+            # named exports are rendered on demand and not kept
+            content = await run_in_threadpool(
+                render_pdf_bytes, repository, kind, plan_ids['diet'], plan_ids['workout'], user_details
+            )
+        else:
+            pdf_path = await run_in_threadpool(
+                cached_plan_pdf, repository, kind, plan_ids['diet'], plan_ids['workout'], user_details
+            )
+            content = await run_in_threadpool(read_bytes, pdf_path)
+    filename = f"{PLAN_PDF_KINDS[kind][0]}.pdf"
+    return Response(content, media_type="application/pdf",
+                    headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+
+
+async def health(request):
+    """GET /health - liveness and current load"""
+    limiter = request.app.state.limiter
+    return JSONResponse({'status': 'ok', 'pending': limiter.pending, 'limit': limiter.limit,
+                         'generating': len(request.app.state.inflight)})
+
+
+async def overloaded(request, exc):
+    return JSONResponse({'detail': "Server busy, retry later"}, status_code=503,
+                        headers={'Retry-After': RETRY_AFTER_SECONDS})
+
+
+async def http_error(request, exc):
+    return JSONResponse({'detail': exc.detail}, status_code=exc.status_code)
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    load_dotenv()
+    if not planner.stub_enabled():
+        planner.configure(os.getenv("GOOGLE_API_KEY"))
+    app.state.repository = get_repository()
+    max_concurrency = int(os.getenv("API_MAX_CONCURRENCY", MAX_CONCURRENCY))
+    max_waiting = int(os.getenv("API_MAX_WAITING", MAX_WAITING))
+    # Created inside the running loop so the semaphores bind to it
+    app.state.limiter = ConcurrencyLimiter(max_concurrency, max_waiting)
+    app.state.pdf_limiter = ConcurrencyLimiter(int(os.getenv("API_MAX_PDF_CONCURRENCY", MAX_PDF_CONCURRENCY)),
+                                               max_waiting)
+    # (profile hash, plan type) -> Generation, so concurrent requests share one model call
+    app.state.inflight = {}
+    yield
+
+
+app = Starlette(
+    routes=[
+        Route("/plans", submit_profile, methods=["POST"]),
+        Route("/plans/{profile_hash}/pdf/{kind}", plan_pdf),
+        Route("/plans/{profile_hash}/{plan_type}/stream", stream_plan),
+        Route("/health", health),
+    ],
+    exception_handlers={Overloaded: overloaded, HTTPException: http_error},
+    lifespan=lifespan,
+)
@@ -1,9 +1,12 @@
 import streamlit as st
 import os
+import uuid
 from dotenv import load_dotenv
-import google.generativeai as genai
-from pdf_generator import generate_pdf
-from datetime import datetime
+import planner
+import speculative
+from pdf_generator import cached_plan_pdf, format_user_details, personal_info_for
+from charts import nutrition_chart, training_volume_chart
+from plan_store import get_repository, profile_hash
 
 # Load environment variables
 load_dotenv()
@@ -99,50 +102,58 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Initialize session state variables
-if 'generated_diet_plan' not in st.session_state:
-    st.session_state.generated_diet_plan = None
-if 'generated_workout_plan' not in st.session_state:
-    st.session_state.generated_workout_plan = None
-if 'personal_info' not in st.session_state:
-    st.session_state.personal_info = {}
+# Initialize session state variables - only IDs are kept per session,
+# plan text and personal info live in the plan repository
+if 'plan_set_id' not in st.session_state:
+    st.session_state.plan_set_id = None
+if 'history_checked' not in st.session_state:
+    st.session_state.history_checked = False
+if 'session_key' not in st.session_state:
+    st.session_state.session_key = uuid.uuid4().hex
+if 'initial_profile_key' not in st.session_state:
+    st.session_state.initial_profile_key = None
 
 # Configure Google Generative AI with the API key
 if api_key:
-    genai.configure(api_key=api_key)
+    planner.configure(api_key)
+
+@st.cache_resource
+def get_plan_repository():
+    """Shared plan repository for all sessions"""
+    return get_repository()
+
+@st.cache_resource
+def get_prefetcher():
+    """Shared speculative prefetcher for all sessions"""
+    return speculative.SpeculativePrefetcher(get_plan_repository())
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def load_plan_text(plan_id):
+    """Load plan text by id; stored plans never change so they are safe to cache"""
+    return get_plan_repository().load_plan(plan_id)
+
+def get_user_id():
+    """Return a stable per-browser user id, kept in the page URL so it survives refreshes
+
+    The uid is the only credential for a user's plan history: anyone with the
+    link can read it, so the URL should not be shared.
+    """
+    user_id = st.query_params.get("uid")
+    if not user_id:
+        user_id = uuid.uuid4().hex
+        st.query_params["uid"] = user_id
+    return user_id
+
+def format_plan_set(plan_set):
+    """Short label for a plan set in the history list"""
+    info = plan_set['personal_info']
+    created = plan_set['created_at'][:16].replace('T', ' ')
+    return f"{created} · {info.get('diet_goal', 'N/A')} / {info.get('fitness_goal', 'N/A')}"
 
 def generate_diet_plan(user_data):
     """Generate a diet plan based on user data using Google's Generative AI"""
     try:
-        model = genai.GenerativeModel('gemini-2.5-flash')
-        
-        prompt = f"""
-        Create a detailed, personalized 7-day diet plan for a person with the following characteristics:
-        - Age: {user_data['age']}
-        - Gender: {user_data['gender']}
-        - Height: {user_data['height']} cm
-        - Weight: {user_data['weight']} kg
-        - Activity Level: {user_data['activity_level']}
-        - Diet Goal: {user_data['diet_goal']}
-        - Dietary Restrictions: {user_data['dietary_restrictions']}
-        - Food Preferences: {user_data['food_preferences']}
-        - Allergies: {user_data['allergies']}
-        - Medical Conditions: {user_data['medical_conditions']}
-        
-        The diet plan should:
-        1. Include 3 main meals (breakfast, lunch, dinner) and 2 snacks per day
-        2. Specify portion sizes and approximate calories for each meal
-        3. Ensure nutritional balance with appropriate macronutrients
-        4. Respect all dietary restrictions and allergies
-        5. Support their goal of {user_data['diet_goal']}
-        6. Include a brief explanation of why this plan suits their needs
-        7. Include a shopping list for the ingredients needed
-        
-        Format the response in a clean, organized way with clear headings for each day and meal.
-        """
-        
-        response = model.generate_content(prompt)
-        return response.text
+        return planner.generate_diet_plan(user_data)
     except Exception as e:
         st.error(f"Error generating diet plan: {str(e)}")
         return None
@@ -150,36 +161,7 @@ def generate_diet_plan(user_data):
 def generate_workout_plan(user_data):
     """Generate a workout plan based on user data using Google's Generative AI"""
     try:
-        model = genai.GenerativeModel('gemini-2.5-flash')
-        
-        prompt = f"""
-        Create a detailed, personalized 7-day workout plan for a person with the following characteristics:
-        - Age: {user_data['age']}
-        - Gender: {user_data['gender']}
-        - Height: {user_data['height']} cm
-        - Weight: {user_data['weight']} kg
-        - Activity Level: {user_data['activity_level']}
-        - Fitness Goal: {user_data['fitness_goal']}
-        - Available Equipment: {user_data['available_equipment']}
-        - Time Available Per Day: {user_data['time_available']} minutes
-        - Exercise Experience: {user_data['exercise_experience']}
-        - Medical Conditions: {user_data['medical_conditions']}
-        
-        The workout plan should:
-        1. Include appropriate exercises for each day with sets, reps, and rest periods
-        2. Have a mix of cardio, strength, and flexibility exercises as appropriate
-        3. Include warm-up and cool-down routines
-        4. Be appropriate for their experience level
-        5. Respect any medical conditions or limitations
-        6. Support their goal of {user_data['fitness_goal']}
-        7. Include a brief explanation of why this plan suits their needs
-        8. Include rest days as appropriate
-        
-        Format the response in a clean, organized way with clear headings for each day and exercise.
-        """
-        
-        response = model.generate_content(prompt)
-        return response.text
+        return planner.generate_workout_plan(user_data)
     except Exception as e:
         st.error(f"Error generating workout plan: {str(e)}")
         return None
@@ -207,8 +189,17 @@ def main():
         st.markdown("3. Save the file and restart the application")
         return
     
+    user_id = get_user_id()
+    repository = get_plan_repository()
+    
+    # Returning users get their most recent plans back without a new generation
+    if not st.session_state.history_checked:
+        latest = repository.latest_plan_set(user_id)
+        st.session_state.plan_set_id = latest['id'] if latest else None
+        st.session_state.history_checked = True
+    
     # Display welcome section and developer info if no plans have been generated yet
-    if 'generated_diet_plan' not in st.session_state or not st.session_state.generated_diet_plan:
+    if not st.session_state.plan_set_id:
         st.markdown("## 👋 Welcome to AI Diet & Workout Planner")
         st.markdown("""
         This app creates personalized diet and workout plans tailored to your specific needs and goals.
@@ -260,18 +251,18 @@ def main():
         with st.expander("🎯 Activity & Goals", expanded=True):
             activity_level = st.select_slider(
                 "Activity Level *",
-                options=["Sedentary", "Lightly Active", "Moderately Active", "Very Active", "Extremely Active"],
+                options=planner.ACTIVITY_LEVELS,
                 value="Moderately Active",
                 help="How active you are in your daily life"
             )
             diet_goal = st.selectbox(
                 "Diet Goal *",
-                ["Weight Loss", "Weight Maintenance", "Weight Gain", "Muscle Building", "Improved Energy", "Better Health"],
+                planner.DIET_GOALS,
                 help="What you want to achieve with your diet"
             )
             fitness_goal = st.selectbox(
                 "Fitness Goal *",
-                ["Weight Loss", "Muscle Building", "Endurance", "Flexibility", "General Fitness", "Strength"],
+                planner.FITNESS_GOALS,
                 help="What you want to achieve with your fitness routine"
             )
         
@@ -279,7 +270,7 @@ def main():
         with st.expander("🍽️ Diet Preferences"):
             diet_type = st.selectbox(
                 "Diet Type *",
-                ["No Restrictions", "Vegetarian", "Vegan", "Pescatarian", "Keto", "Paleo", "Mediterranean"],
+                planner.DIET_TYPES,
                 help="Select your dietary preference"
             )
             
@@ -315,7 +306,7 @@ def main():
                                      help="How much time you can dedicate to exercise each day")
             exercise_experience = st.select_slider(
                 "Exercise Experience",
-                options=["Beginner", "Intermediate", "Advanced"],
+                options=planner.EXPERIENCE_LEVELS,
                 value="Beginner",
                 help="Your current level of exercise experience"
             )
@@ -333,154 +324,156 @@ def main():
             injuries = st.text_area("Injuries/Limitations (optional)", "",
                                   help="Any injuries or physical limitations to consider")
         
+        # Previously generated plans for this user
+        history = repository.history(user_id)
+        if history:
+            with st.expander("📜 Previous Plans", expanded=False):
+                history_ids = [plan_set['id'] for plan_set in history]
+                labels = {plan_set['id']: format_plan_set(plan_set) for plan_set in history}
+                current_id = st.session_state.plan_set_id
+                selected_id = st.selectbox(
+                    "Load a previous plan",
+                    history_ids,
+                    index=history_ids.index(current_id) if current_id in history_ids else 0,
+                    format_func=labels.get
+                )
+                if selected_id != current_id:
+                    st.session_state.plan_set_id = selected_id
+        
         # Generate button
         generate_button = st.button("Generate Plans", use_container_width=True)
     
+    # Collect user data
+    user_data = {
+        'age': age,
+        'gender': gender,
+        'height': height,
+        'weight': weight,
+        'activity_level': activity_level,
+        'diet_goal': diet_goal,
+        'fitness_goal': fitness_goal,
+        'dietary_restrictions': diet_type,
+        'food_preferences': foods_to_avoid,
+        'allergies': ', '.join(allergies),
+        'meals_per_day': meals_per_day,
+        'available_equipment': ', '.join(available_equipment),
+        'time_available': time_available,
+        'exercise_experience': exercise_experience,
+        'exercise_preferences': ', '.join(exercise_preferences),
+        'medical_conditions': medical_conditions,
+        'medications': medications,
+        'injuries': injuries
+    }
+    
+    # Speculatively generate once the inputs settle, so plans are ready on click.
+    # The profile the session started with is skipped, including when the user
+    # edits a field and then changes it back.
+    if speculative.enabled() and not generate_button:
+        if st.session_state.initial_profile_key is None:
+            st.session_state.initial_profile_key = profile_hash(user_data)
+        elif profile_hash(user_data) == st.session_state.initial_profile_key:
+            get_prefetcher().cancel(st.session_state.session_key)
+        else:
+            get_prefetcher().schedule(st.session_state.session_key, user_data)
+    
     # Main content area
     if generate_button:
         with st.spinner("Generating your personalized plans... This may take a minute."):
             # Get name from session state (from text_input with key="name")
             user_name = st.session_state.get('name', '')
             
-            # Collect user data
-            user_data = {
-                'age': age,
-                'gender': gender,
-                'height': height,
-                'weight': weight,
-                'activity_level': activity_level,
-                'diet_goal': diet_goal,
-                'fitness_goal': fitness_goal,
-                'dietary_restrictions': diet_type,
-                'food_preferences': foods_to_avoid,
-                'allergies': ', '.join(allergies),
-                'available_equipment': ', '.join(available_equipment),
-                'time_available': time_available,
-                'exercise_experience': exercise_experience,
-                'medical_conditions': medical_conditions
-            }
+            # Personal info is stored with the plan set for PDF generation
+            personal_info = personal_info_for(user_data, user_name)
             
-            # IMPORTANT: Store personal info in session state for PDF generation
-            st.session_state.personal_info = {
-                'name': user_name if user_name else 'User',
-                'age': age,
-                'gender': gender,
-                'height': height,
-                'weight': weight,
-                'activity_level': activity_level,
-                'diet_goal': diet_goal,
-                'fitness_goal': fitness_goal
-            }
+            # Wait for a speculative generation of these exact inputs, if one is running
+            if speculative.enabled():
+                get_prefetcher().claim(st.session_state.session_key, user_data)
             
-            # Generate plans
-            diet_plan = generate_diet_plan(user_data)
-            workout_plan = generate_workout_plan(user_data)
+            # Reuse stored plans for an identical profile, otherwise generate them
+            profile_key = profile_hash(user_data)
+            repository.log_request(profile_key, user_data)
+            diet_plan_id = repository.find_plan_id(profile_key, "diet")
+            if diet_plan_id is None:
+                diet_plan = generate_diet_plan(user_data)
+                if diet_plan:
+                    diet_plan_id = repository.save_plan(profile_key, "diet", diet_plan)
             
-            if diet_plan and workout_plan:
-                st.session_state.generated_diet_plan = diet_plan
-                st.session_state.generated_workout_plan = workout_plan
+            workout_plan_id = repository.find_plan_id(profile_key, "workout")
+            if workout_plan_id is None:
+                workout_plan = generate_workout_plan(user_data)
+                if workout_plan:
+                    workout_plan_id = repository.save_plan(profile_key, "workout", workout_plan)
+            
+            if diet_plan_id and workout_plan_id:
+                st.session_state.plan_set_id = repository.create_plan_set(
+                    user_id, profile_key, personal_info, diet_plan_id, workout_plan_id
+                )
     
     # Display generated plans
-    if st.session_state.generated_diet_plan and st.session_state.generated_workout_plan:
-        tab1, tab2 = st.tabs(["Diet Plan", "Workout Plan"])
+    plan_set = repository.get_plan_set(st.session_state.plan_set_id) if st.session_state.plan_set_id else None
+    if plan_set:
+        # Only the selected plan is loaded from the repository on each run
+        selected_plan = st.radio("Plan", ["Diet Plan", "Workout Plan"], horizontal=True,
+                                 label_visibility="collapsed")
         
-        with tab1:
+        if selected_plan == "Diet Plan":
+            diet_plan = load_plan_text(plan_set['diet_plan_id'])
             st.markdown("## 🍽️ Your Personalized Diet Plan")
             with st.container():
                 st.markdown('<div class="plan-container">', unsafe_allow_html=True)
-                st.markdown(st.session_state.generated_diet_plan)
+                st.markdown(diet_plan)
                 st.markdown('</div>', unsafe_allow_html=True)
+            # Charts are cached per plan hash, so reruns reuse the same PNG bytes
+            diet_chart = nutrition_chart(diet_plan)
+            if diet_chart:
+                st.markdown("### 📊 Daily Calories & Macros")
+                st.image(diet_chart)
         
-        with tab2:
+        else:
+            workout_plan = load_plan_text(plan_set['workout_plan_id'])
             st.markdown("## 💪 Your Personalized Workout Plan")
             with st.container():
                 st.markdown('<div class="plan-container">', unsafe_allow_html=True)
-                st.markdown(st.session_state.generated_workout_plan)
+                st.markdown(workout_plan)
                 st.markdown('</div>', unsafe_allow_html=True)
+            workout_chart = training_volume_chart(workout_plan)
+            if workout_chart:
+                st.markdown("### 📊 Weekly Training Volume")
+                st.image(workout_chart)
         
         # Export to PDF
         st.markdown("### 📄 Export Your Plans")
         col1, col2, col3 = st.columns([1, 1, 1])
         
-        # Store PDF paths in session state
-        if "diet_pdf_path" not in st.session_state:
-            st.session_state.diet_pdf_path = None
-        if "workout_pdf_path" not in st.session_state:
-            st.session_state.workout_pdf_path = None
-        if "combined_pdf_path" not in st.session_state:
-            st.session_state.combined_pdf_path = None
-        
         # Create formatted user details string (do this once, outside the buttons)
-        personal_info = st.session_state.get('personal_info', {})
-        user_details = f"""<b>Name:</b> {personal_info.get('name', 'User')}<br/>
-<b>Age:</b> {personal_info.get('age', 'N/A')} years | <b>Gender:</b> {personal_info.get('gender', 'N/A')}<br/>
-<b>Height:</b> {personal_info.get('height', 'N/A')} cm | <b>Weight:</b> {personal_info.get('weight', 'N/A')} kg<br/>
-<b>Activity Level:</b> {personal_info.get('activity_level', 'N/A')}<br/>
-<b>Diet Goal:</b> {personal_info.get('diet_goal', 'N/A')} | <b>Fitness Goal:</b> {personal_info.get('fitness_goal', 'N/A')}"""
-        
-        with col1:
-            if st.button("Generate Diet Plan PDF"):
-                st.session_state.diet_pdf_path = generate_pdf(
-                    st.session_state.generated_diet_plan,
-                    f"Diet_Plan_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
-                    "Personalized Diet Plan",
-                    user_details
-                )
-                st.success("Diet Plan PDF generated successfully!")
-            
-            # Only show download button if PDF has been generated
-            if st.session_state.diet_pdf_path:
-                with open(st.session_state.diet_pdf_path, "rb") as f:
-                    st.download_button(
-                        label="📥 Download Diet Plan",
-                        data=f,
-                        file_name=os.path.basename(st.session_state.diet_pdf_path),
-                        mime="application/pdf",
-                        use_container_width=True
-                    )
+        user_details = format_user_details(plan_set['personal_info'])
         
-        with col2:
-            if st.button("Generate Workout Plan PDF"):
-                st.session_state.workout_pdf_path = generate_pdf(
-                    st.session_state.generated_workout_plan,
-                    f"Workout_Plan_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
-                    "Personalized Workout Plan",
-                    user_details
-                )
-                st.success("Workout Plan PDF generated successfully!")
-            
-            # Only show download button if PDF has been generated
-            if st.session_state.workout_pdf_path:
-                with open(st.session_state.workout_pdf_path, "rb") as f:
-                    st.download_button(
-                        label="📥 Download Workout Plan",
-                        data=f,
-                        file_name=os.path.basename(st.session_state.workout_pdf_path),
-                        mime="application/pdf",
-                        use_container_width=True
-                    )
+        pdf_buttons = {
+            'diet': ("Generate Diet Plan PDF", "📥 Download Diet Plan", "Diet Plan PDF generated successfully!"),
+            'workout': ("Generate Workout Plan PDF", "📥 Download Workout Plan", "Workout Plan PDF generated successfully!"),
+            'combined': ("Generate Combined PDF", "📥 Download Combined Plan", "Combined PDF generated successfully!"),
+        }
         
-        with col3:
-            if st.button("Generate Combined PDF"):
-                combined_content = "# PERSONALIZED DIET PLAN\n\n" + st.session_state.generated_diet_plan + "\n\n# PERSONALIZED WORKOUT PLAN\n\n" + st.session_state.generated_workout_plan
-                st.session_state.combined_pdf_path = generate_pdf(
-                    combined_content,
-                    f"Combined_Plan_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
-                    "Combined Diet & Workout Plan",
-                    user_details
-                )
-                st.success("Combined PDF generated successfully!")
-            
-            # Only show download button if PDF has been generated
-            if st.session_state.combined_pdf_path:
-                with open(st.session_state.combined_pdf_path, "rb") as f:
-                    st.download_button(
-                        label="📥 Download Combined Plan",
-                        data=f,
-                        file_name=os.path.basename(st.session_state.combined_pdf_path),
-                        mime="application/pdf",
-                        use_container_width=True
-                    )
+        for column, (kind, (button_label, download_label, success_message)) in zip((col1, col2, col3), pdf_buttons.items()):
+            with column:
+                if st.button(button_label):
+                    # Reuses an identical earlier (or pre-warmed) export when there is one
+                    pdf_path = cached_plan_pdf(repository, kind, plan_set['diet_plan_id'],
+                                               plan_set['workout_plan_id'], user_details)
+                    repository.save_pdf_path(plan_set['id'], kind, pdf_path)
+                    st.success(success_message)
+                
+                # Only show download button if PDF has been generated
+                pdf_path = repository.get_pdf_path(plan_set['id'], kind)
+                if pdf_path and os.path.exists(pdf_path):
+                    with open(pdf_path, "rb") as f:
+                        st.download_button(
+                            label=download_label,
+                            data=f,
+                            file_name=os.path.basename(pdf_path),
+                            mime="application/pdf",
+                            use_container_width=True
+                        )
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
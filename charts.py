@@ -0,0 +1,194 @@
+import hashlib
+import io
+import re
+import threading
+
+import matplotlib
+matplotlib.use("Agg")  # Headless backend, safe to use from Streamlit and PDF export
+import matplotlib.pyplot as plt
+import pandas as pd
+
+# Rendered charts keyed by (plan hash, chart name). Shared across Streamlit
+# sessions and reruns so each figure is only ever drawn once per plan.
+MAX_CACHED_CHARTS = 256
+_chart_cache = {}
+_chart_lock = threading.Lock()
+
+DAY_PATTERN = re.compile(
+    r'^\W*(Day\s+\d+|Monday|Tuesday|Wednesday|Thursday|Friday|Saturday|Sunday)\b',
+    re.IGNORECASE
+)
+# Headings of the sections that follow the days (explanation, shopping list, ...).
+# They end the last day so their text is not counted towards it.
+SECTION_END_PATTERN = re.compile(
+    r'^(?:#{1,6}|\*\*)\s*(?:\d+\.\s*)?(?:weekly\s+)?'
+    r'(?:why|explanation|rationale|shopping|grocery|notes?|tips|summary|important|disclaimer|'
+    r'general|additional|hydration|supplements?|progression|safety)\b',
+    re.IGNORECASE
+)
+CALORIE_PATTERN = re.compile(r'(\d{1,3}(?:,\d{3})+|\d+)\s*(?:kcal|calories|cal)\b', re.IGNORECASE)
+MACRO_PATTERNS = {
+    'Protein': re.compile(r'protein\W{0,3}(\d+(?:\.\d+)?)\s*g\b', re.IGNORECASE),
+    'Carbs': re.compile(r'carb(?:ohydrate)?s?\W{0,3}(\d+(?:\.\d+)?)\s*g\b', re.IGNORECASE),
+    'Fat': re.compile(r'fats?\W{0,3}(\d+(?:\.\d+)?)\s*g\b', re.IGNORECASE),
+}
+# "reps" is optional ("3x12"), so counts followed by a weight or duration unit
+# ("3 x 10 lb", "2x 30 seconds") are rejected
+SETS_REPS_PATTERN = re.compile(
+    r'(\d+)\s*(?:sets?\s*(?:of|x|×)?|x|×)\s*(\d+)(?:\s*-\s*(\d+))?(?![\d-])'
+    r'(?!\s*(?:lbs?|kgs?|pounds?|s|secs?|seconds?|mins?|minutes?)\b)\s*(?:reps?|repetitions)?',
+    re.IGNORECASE
+)
+MINUTES_PATTERN = re.compile(r'(\d+)\s*(?:-\s*(\d+)\s*)?(?:min|minutes)\b', re.IGNORECASE)
+
+CHART_COLORS = ['#1a5490', '#2c7bb6', '#abd9e9', '#fdae61']
+
+
+def plan_hash(plan_text):
+    """Return a stable hash identifying a generated plan"""
+    return hashlib.sha256(plan_text.encode('utf-8')).hexdigest()
+
+
+def split_days(plan_text):
+    """Split a plan into (day label, lines) pairs using its day headings
+
+    A day runs until the next day heading or a closing section heading such as
+    the explanation or shopping list.
+    """
+    days = []
+    current_label = None
+    current_lines = []
+    for raw_line in plan_text.split("\n"):
+        line = raw_line.strip()
+        match = DAY_PATTERN.match(line)
+        if match or SECTION_END_PATTERN.match(line):
+            if current_label is not None:
+                days.append((current_label, current_lines))
+            current_label = match.group(1).title() if match else None
+            current_lines = [line]
+        elif current_label is not None:
+            current_lines.append(line)
+    if current_label is not None:
+        days.append((current_label, current_lines))
+
+    # Keep the first occurrence of each day and preserve plan order
+    seen = set()
+    unique_days = []
+    for label, lines in days:
+        if label not in seen:
+            seen.add(label)
+            unique_days.append((label, lines))
+    return unique_days
+
+
+def nutrition_dataframe(diet_plan):
+    """Build a per-day calorie and macronutrient table from a diet plan"""
+    rows = []
+    for label, lines in split_days(diet_plan):
+        row = {'Day': label, 'Calories': 0.0, 'Protein': 0.0, 'Carbs': 0.0, 'Fat': 0.0}
+        for line in lines:
+            # Skip daily totals so meals are not counted twice
+            if re.search(r'\btotal\b', line, re.IGNORECASE):
+                continue
+            calorie_match = CALORIE_PATTERN.search(line)
+            if calorie_match:
+                row['Calories'] += float(calorie_match.group(1).replace(',', ''))
+            for macro, pattern in MACRO_PATTERNS.items():
+                macro_match = pattern.search(line)
+                if macro_match:
+                    row[macro] += float(macro_match.group(1))
+        rows.append(row)
+    return pd.DataFrame(rows, columns=['Day', 'Calories', 'Protein', 'Carbs', 'Fat'])
+
+
+def training_volume_dataframe(workout_plan):
+    """Build a per-day training volume table (total reps and minutes) from a workout plan"""
+    rows = []
+    for label, lines in split_days(workout_plan):
+        row = {'Day': label, 'Reps': 0.0, 'Minutes': 0.0}
+        for line in lines:
+            for sets, reps_low, reps_high in SETS_REPS_PATTERN.findall(line):
+                reps = float(reps_low)
+                if reps_high:
+                    reps = (reps + float(reps_high)) / 2
+                row['Reps'] += float(sets) * reps
+            minutes_match = MINUTES_PATTERN.search(line)
+            if minutes_match:
+                low, high = minutes_match.groups()
+                row['Minutes'] += (float(low) + float(high)) / 2 if high else float(low)
+        rows.append(row)
+    return pd.DataFrame(rows, columns=['Day', 'Reps', 'Minutes'])
+
+
+def _figure_to_png(fig):
+    """Serialize a matplotlib figure to PNG bytes and release it"""
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', dpi=120, bbox_inches='tight')
+    plt.close(fig)
+    return buffer.getvalue()
+
+
+def _render_nutrition_chart(df):
+    """Render daily calories with stacked macronutrient grams"""
+    fig, (cal_ax, macro_ax) = plt.subplots(1, 2, figsize=(10, 3.5))
+
+    cal_ax.bar(df['Day'], df['Calories'], color=CHART_COLORS[0])
+    cal_ax.set_title('Calories per Day')
+    cal_ax.set_ylabel('kcal')
+    cal_ax.tick_params(axis='x', rotation=45)
+
+    bottom = pd.Series(0.0, index=df.index)
+    for color, macro in zip(CHART_COLORS[1:], ['Protein', 'Carbs', 'Fat']):
+        macro_ax.bar(df['Day'], df[macro], bottom=bottom, color=color, label=macro)
+        bottom += df[macro]
+    macro_ax.set_title('Macronutrients per Day')
+    macro_ax.set_ylabel('grams')
+    macro_ax.tick_params(axis='x', rotation=45)
+    macro_ax.legend(fontsize=8)
+
+    fig.tight_layout()
+    return _figure_to_png(fig)
+
+
+def _render_training_chart(df):
+    """Render daily training volume (reps) alongside timed work (minutes)"""
+    fig, reps_ax = plt.subplots(figsize=(10, 3.5))
+    reps_ax.bar(df['Day'], df['Reps'], color=CHART_COLORS[1], label='Total reps')
+    reps_ax.set_ylabel('Total reps (sets × reps)')
+    reps_ax.tick_params(axis='x', rotation=45)
+
+    minutes_ax = reps_ax.twinx()
+    minutes_ax.plot(df['Day'], df['Minutes'], color=CHART_COLORS[3], marker='o', label='Timed minutes')
+    minutes_ax.set_ylabel('Minutes')
+
+    reps_ax.set_title(f"Weekly Training Volume: {int(df['Reps'].sum())} reps, {int(df['Minutes'].sum())} min")
+    fig.tight_layout()
+    return _figure_to_png(fig)
+
+
+def _cached_chart(plan_text, chart_name, build_df, render):
+    """Return cached PNG bytes for a chart, rendering it on first use only"""
+    key = (plan_hash(plan_text), chart_name)
+    # pyplot is not thread-safe, so rendering is serialized across sessions
+    with _chart_lock:
+        if key in _chart_cache:
+            return _chart_cache[key]
+
+        df = build_df(plan_text)
+        # Nothing to plot if the plan could not be parsed into days with numbers
+        png = render(df) if not df.empty and df.drop(columns='Day').to_numpy().sum() > 0 else None
+        if len(_chart_cache) >= MAX_CACHED_CHARTS:
+            # Drop the oldest entry (dicts keep insertion order)
+            _chart_cache.pop(next(iter(_chart_cache)))
+        _chart_cache[key] = png
+        return png
+
+
+def nutrition_chart(diet_plan):
+    """PNG bytes of the per-day calorie/macro chart, or None if nothing could be parsed"""
+    return _cached_chart(diet_plan, 'nutrition', nutrition_dataframe, _render_nutrition_chart)
+
+
+def training_volume_chart(workout_plan):
+    """PNG bytes of the weekly training-volume chart, or None if nothing could be parsed"""
+    return _cached_chart(workout_plan, 'training_volume', training_volume_dataframe, _render_training_chart)
@@ -0,0 +1,82 @@
+"""Local load test for the HTTP API.
+
+Start the API with the stub model, then run the load test:
+
+    PLANNER_STUB_MODEL=1 STUB_LATENCY_SECONDS=2 uvicorn api:app --port 8000
+    python loadtest.py --url http://localhost:8000 --users 200 --distinct 50
+"""
+import argparse
+import asyncio
+import random
+import time
+
+import httpx
+
+import planner
+
+
+def random_profile(index):
+    """A valid profile; index picks one of a fixed set so some requests repeat"""
+    rng = random.Random(index)
+    return {
+        'age': rng.randint(18, 70),
+        'gender': rng.choice(["Male", "Female", "Other"]),
+        'height': rng.randint(150, 200),
+        'weight': rng.randint(50, 120),
+        'activity_level': rng.choice(planner.ACTIVITY_LEVELS),
+        'diet_goal': rng.choice(planner.DIET_GOALS),
+        'fitness_goal': rng.choice(planner.FITNESS_GOALS),
+    }
+
+
+async def run_user(client, profile, results):
+    """Submit a profile and stream both plans, recording latency or failure"""
+    started = time.monotonic()
+    try:
+        response = await client.post("/plans", json=profile)
+        response.raise_for_status()
+        links = response.json()['links']['stream']
+        for url in links.values():
+            async with client.stream("GET", url) as stream:
+                stream.raise_for_status()
+                async for line in stream.aiter_lines():
+                    if line.startswith("event: error"):
+                        raise RuntimeError("stream error")
+        results.append(time.monotonic() - started)
+    except httpx.HTTPStatusError as e:
+        results.append(f"HTTP {e.response.status_code}")
+    except Exception as e:
+        results.append(type(e).__name__)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Load test the plan API")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--users", type=int, default=100, help="Concurrent simulated users")
+    parser.add_argument("--distinct", type=int, default=50, help="Number of distinct profiles")
+    args = parser.parse_args()
+
+    results = []
+    # No keep-alive: reusing a connection the server just closed as idle shows up
+    # as a spurious RemoteProtocolError
+    limits = httpx.Limits(max_connections=args.users, max_keepalive_connections=0)
+    async with httpx.AsyncClient(base_url=args.url, timeout=300, limits=limits) as client:
+        started = time.monotonic()
+        await asyncio.gather(*(
+            run_user(client, random_profile(user % args.distinct), results) for user in range(args.users)
+        ))
+        elapsed = time.monotonic() - started
+
+    latencies = sorted(result for result in results if isinstance(result, float))
+    failures = [result for result in results if not isinstance(result, float)]
+    print(f"{len(results)} users in {elapsed:.1f}s, {len(failures)} failed")
+    if latencies:
+        print(f"p50 {latencies[len(latencies) // 2]:.2f}s  "
+              f"p95 {latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))]:.2f}s  "
+              f"max {latencies[-1]:.2f}s")
+    for failure in sorted(set(failures)):
+        print(f"  {failure}: {failures.count(failure)}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
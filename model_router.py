@@ -0,0 +1,260 @@
+import math
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import google.generativeai as genai
+
+# The settings below are defaults. The environment variable of the same name
+# (MAX_OUTPUT_TOKENS_DIET for a plan type's limit) is read on every request.
+
+# Fallback chains per plan type and request size, fastest model first.
+# Override with e.g. MODEL_CHAIN_DIET_SMALL="gemini-2.5-flash-lite,gemini-2.5-flash"
+DEFAULT_CHAINS = {
+    'small': ['gemini-2.5-flash-lite', 'gemini-2.5-flash'],
+    'large': ['gemini-2.5-flash', 'gemini-2.5-flash-lite'],
+}
+
+# Profiles with long free-text fields (medical conditions, injuries, ...) go to
+# the stronger model first
+LARGE_PROMPT_CHARS = 400
+
+MAX_OUTPUT_TOKENS = {
+    'diet': 12288,
+    'workout': 8192,
+}
+DEFAULT_TEMPERATURE = 0.7
+TEMPERATURE_CAP = 0.9
+
+MODEL_TIMEOUT_SECONDS = 60
+
+# Worker threads for blocking model calls, shared by every caller in the
+# process (Streamlit sessions, speculative prefetch, warm-up workers)
+MODEL_MAX_WORKERS = 32
+
+# Hedging: once a request runs longer than the model's p95 latency, a backup
+# request goes to the next model in the chain and the first usable answer wins
+HEDGE_PERCENTILE = 0.95
+HEDGE_MIN_SAMPLES = 20
+HEDGE_DEFAULT_SECONDS = 25
+# How often to re-check a request that is still queued for a worker, or whose
+# backup is waiting for one; the hedge clock only runs once a call has started
+HEDGE_POLL_SECONDS = 0.05
+# Backup requests run in a pool of their own, this share of MODEL_MAX_WORKERS
+# on top of it, so hedges and the losers left to finish never take a worker a
+# primary call is waiting for
+HEDGE_WORKER_SHARE = 0.25
+
+
+def chain_for(plan_type, size):
+    """Return the configured model chain for a plan type and request size"""
+    configured = os.getenv(f"MODEL_CHAIN_{plan_type.upper()}_{size.upper()}")
+    if configured:
+        return [name.strip() for name in configured.split(',') if name.strip()]
+    return list(DEFAULT_CHAINS[size])
+
+
+def request_options():
+    """Per-call request options for the Gemini client"""
+    return {'timeout': float(os.getenv("MODEL_TIMEOUT_SECONDS", MODEL_TIMEOUT_SECONDS))}
+
+
+def check_finished(response):
+    """Raise if the model stopped because it hit the output token limit
+
+    A truncated plan is missing its last days, so it counts as a failure.
+    """
+    candidates = getattr(response, 'candidates', None)
+    if candidates:
+        reason = candidates[0].finish_reason
+        if getattr(reason, 'name', reason) in ('MAX_TOKENS', 2):
+            raise ValueError("response truncated at the output token limit")
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies per model"""
+
+    def __init__(self, window=200):
+        self._samples = {}
+        self._window = window
+        self._lock = threading.Lock()
+
+    def record(self, model_name, seconds):
+        with self._lock:
+            self._samples.setdefault(model_name, deque(maxlen=self._window)).append(seconds)
+
+    def percentile(self, model_name, fraction):
+        """Latency at the given fraction, or None until enough samples exist"""
+        with self._lock:
+            samples = sorted(self._samples.get(model_name, ()))
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            return None
+        return samples[min(len(samples) - 1, int(fraction * len(samples)))]
+
+
+class Attempt:
+    """One call to one model, submitted to the router's worker pool"""
+
+    def __init__(self, model_name, hedge_delay):
+        self.model_name = model_name
+        self.hedge_delay = hedge_delay
+        # Set by the worker thread, so time spent queued does not count towards the hedge delay
+        self.started_at = None
+
+    def hedge_due_in(self):
+        """Seconds until a backup request is due, or None while the call is still queued"""
+        if self.started_at is None:
+            return None
+        return max(0.0, self.started_at + self.hedge_delay - time.monotonic())
+
+
+class ModelRouter:
+    """Picks a model chain per request, falls back on errors and hedges slow calls
+
+    model_factory(plan_type, model_name) returns a model handle with the plan
+    type's instructions attached.
+    """
+
+    def __init__(self, model_factory, max_workers=None):
+        self.model_factory = model_factory
+        self.latencies = LatencyTracker()
+        if max_workers is None:
+            max_workers = int(os.getenv("MODEL_MAX_WORKERS", MODEL_MAX_WORKERS))
+        self.max_workers = max_workers
+        self.hedge_workers = max(1, math.ceil(max_workers * HEDGE_WORKER_SHARE))
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="model")
+        self._hedge_executor = ThreadPoolExecutor(max_workers=self.hedge_workers, thread_name_prefix="model-hedge")
+        self._hedges = 0
+        self._hedges_lock = threading.Lock()
+
+    def route(self, plan_type, prompt):
+        """Return the model chain to try for this request"""
+        large_prompt_chars = int(os.getenv("LARGE_PROMPT_CHARS", LARGE_PROMPT_CHARS))
+        size = 'large' if len(prompt) > large_prompt_chars else 'small'
+        return chain_for(plan_type, size)
+
+    def generation_config(self, plan_type, temperature=None):
+        """Generation settings with the output length and temperature capped"""
+        requested = DEFAULT_TEMPERATURE if temperature is None else temperature
+        max_tokens = int(os.getenv(f"MAX_OUTPUT_TOKENS_{plan_type.upper()}", MAX_OUTPUT_TOKENS[plan_type]))
+        cap = float(os.getenv("TEMPERATURE_CAP", TEMPERATURE_CAP))
+        return genai.GenerationConfig(max_output_tokens=max_tokens, temperature=min(requested, cap))
+
+    def hedge_delay(self, model_name):
+        """Seconds to wait on a model before sending a backup request"""
+        p95 = self.latencies.percentile(model_name, HEDGE_PERCENTILE)
+        if p95 is not None:
+            return p95
+        return float(os.getenv("HEDGE_DEFAULT_SECONDS", HEDGE_DEFAULT_SECONDS))
+
+    def _submit(self, *args, hedge=False):
+        if not hedge:
+            return self._executor.submit(self._call, *args)
+        with self._hedges_lock:
+            self._hedges += 1
+        future = self._hedge_executor.submit(self._call, *args)
+        future.add_done_callback(self._release_hedge)
+        return future
+
+    def _release_hedge(self, future):
+        with self._hedges_lock:
+            self._hedges -= 1
+
+    def has_free_hedge_worker(self):
+        """True if a backup request would start right away instead of queueing"""
+        with self._hedges_lock:
+            return self._hedges < self.hedge_workers
+
+    def _call(self, attempt, plan_type, prompt, config):
+        attempt.started_at = time.monotonic()
+        model = self.model_factory(plan_type, attempt.model_name)
+        response = model.generate_content(
+            prompt,
+            generation_config=config,
+            request_options=request_options()
+        )
+        # Raises for blocked or empty responses, which then count as failures
+        text = response.text
+        if not text.strip():
+            raise ValueError("empty response")
+        check_finished(response)
+        self.latencies.record(attempt.model_name, time.monotonic() - attempt.started_at)
+        return text
+
+    def generate(self, plan_type, prompt, temperature=None):
+        """Return the first usable response from the plan type's model chain"""
+        remaining = self.route(plan_type, prompt)
+        config = self.generation_config(plan_type, temperature)
+        in_flight = {}
+        errors = []
+
+        def launch(hedge=False):
+            model_name = remaining.pop(0)
+            attempt = Attempt(model_name, self.hedge_delay(model_name))
+            in_flight[self._submit(attempt, plan_type, prompt, config, hedge=hedge)] = attempt
+            return attempt
+
+        # The request whose latency decides when to send a backup
+        watched = launch()
+        hedged = False
+        while in_flight:
+            timeout = None
+            if remaining and not hedged:
+                due_in = watched.hedge_due_in()
+                timeout = HEDGE_POLL_SECONDS if due_in is None or due_in == 0 else due_in
+            done, _ = wait(in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                # The request passed its p95 latency: race a backup model, unless
+                # the hedge pool is saturated and the backup would only queue
+                if watched.hedge_due_in() == 0 and self.has_free_hedge_worker():
+                    hedged = True
+                    launch(hedge=True)
+                continue
+            for future in done:
+                attempt = in_flight.pop(future)
+                try:
+                    # Slower requests still in flight are left to finish and ignored
+                    return future.result()
+                except Exception as e:
+                    errors.append(f"{attempt.model_name}: {e}")
+                    if remaining and not in_flight:
+                        # Fall back to the next model, which gets its own hedge timer
+                        watched = launch()
+        raise RuntimeError("All models failed - " + "; ".join(errors))
+
+    async def stream_async(self, plan_type, prompt, temperature=None):
+        """Yield text chunks from the first model in the chain that starts responding
+
+        Uses the client's async API, so a stream waiting on the model holds no
+        thread. A stream cannot switch models halfway, so fallback only applies
+        until the first chunk arrives and there is no hedging. A stream
+        truncated at the output token limit raises after its last chunk.
+        """
+        config = self.generation_config(plan_type, temperature)
+        errors = []
+        for model_name in self.route(plan_type, prompt):
+            started = False
+            try:
+                model = self.model_factory(plan_type, model_name)
+                response = await model.generate_content_async(
+                    prompt,
+                    generation_config=config,
+                    request_options=request_options(),
+                    stream=True
+                )
+                async for chunk in response:
+                    text = chunk.text
+                    if text:
+                        started = True
+                        yield text
+                    check_finished(chunk)
+                if started:
+                    return
+                errors.append(f"{model_name}: empty response")
+            except Exception as e:
+                if started:
+                    raise
+                errors.append(f"{model_name}: {e}")
+        raise RuntimeError("All models failed - " + "; ".join(errors))
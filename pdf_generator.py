@@ -1,13 +1,18 @@
 from reportlab.lib.pagesizes import letter, A4
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak, Table, TableStyle, KeepTogether
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak, Table, TableStyle, KeepTogether, Image
+from reportlab.lib.utils import ImageReader
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT, TA_JUSTIFY
 from reportlab.lib import colors
 from reportlab.pdfgen import canvas
+import io
 import os
 import re
 from datetime import datetime
+from xml.sax.saxutils import escape
+from charts import nutrition_chart, training_volume_chart
+from plan_store import pdf_cache_key
 
 class NumberedCanvas(canvas.Canvas):
     """Custom canvas to add page numbers and headers"""
@@ -156,8 +161,18 @@ def parse_meal_line(line):
         return f"<b>{meal_name}</b> <font color='#2c7bb6'>({calories} cal)</font>"
     return clean_markdown(line)
 
-def generate_pdf(content, filename, title, user_details=""):
-    """Generate a professional PDF file from the provided content"""
+def chart_flowable(png_bytes, max_width=7*inch):
+    """Create an Image flowable from PNG bytes, scaled to fit the page width"""
+    img_width, img_height = ImageReader(io.BytesIO(png_bytes)).getSize()
+    scale = min(1.0, max_width / img_width)
+    return Image(io.BytesIO(png_bytes), width=img_width*scale, height=img_height*scale)
+
+def generate_pdf(content, filename, title, user_details="", charts=None):
+    """Generate a professional PDF file from the provided content
+
+    charts is an optional list of (caption, png_bytes) pairs, as returned by the
+    charts module, rendered on a page after the title page.
+    """
     # Create directory for PDFs if it doesn't exist
     pdf_dir = "generated_pdfs"
     if not os.path.exists(pdf_dir):
@@ -213,6 +228,17 @@ def generate_pdf(content, filename, title, user_details=""):
                                           alignment=TA_CENTER, fontSize=10, textColor=colors.grey)))
     elements.append(PageBreak())
     
+    # Charts page - reuses the PNG bytes already rendered for the app
+    rendered_charts = [(caption, png) for caption, png in (charts or []) if png]
+    if rendered_charts:
+        for caption, png in rendered_charts:
+            elements.append(KeepTogether([
+                Paragraph(caption, styles["MealCategory"]),
+                chart_flowable(png),
+                Spacer(1, 0.2*inch)
+            ]))
+        elements.append(PageBreak())
+    
     # Process content
     lines = content.split("\n")
     i = 0
@@ -314,4 +340,66 @@ def generate_pdf(content, filename, title, user_details=""):
     # Build PDF with custom canvas
     doc.build(elements, canvasmaker=NumberedCanvas)
     
-    return pdf_path
\ No newline at end of file
+    return pdf_path
+
+# Export kinds offered for a plan set: (file name prefix, document title)
+PLAN_PDF_KINDS = {
+    'diet': ("Diet_Plan", "Personalized Diet Plan"),
+    'workout': ("Workout_Plan", "Personalized Workout Plan"),
+    'combined': ("Combined_Plan", "Combined Diet & Workout Plan"),
+}
+
+def personal_info_for(user_data, name=''):
+    """Pick the fields shown on the PDF title page from the user's inputs"""
+    info = {'name': name if name else 'User'}
+    for key in ('age', 'gender', 'height', 'weight', 'activity_level', 'diet_goal', 'fitness_goal'):
+        info[key] = user_data[key]
+    return info
+
+def format_user_details(personal_info):
+    """Format personal info for the PDF title page"""
+    # Values are escaped so user input cannot break the ReportLab markup
+    info = {key: escape(str(value)) for key, value in personal_info.items()}
+    return f"""<b>Name:</b> {info.get('name', 'User')}<br/>
+<b>Age:</b> {info.get('age', 'N/A')} years | <b>Gender:</b> {info.get('gender', 'N/A')}<br/>
+<b>Height:</b> {info.get('height', 'N/A')} cm | <b>Weight:</b> {info.get('weight', 'N/A')} kg<br/>
+<b>Activity Level:</b> {info.get('activity_level', 'N/A')}<br/>
+<b>Diet Goal:</b> {info.get('diet_goal', 'N/A')} | <b>Fitness Goal:</b> {info.get('fitness_goal', 'N/A')}"""
+
+def generate_plan_pdf(kind, diet_plan, workout_plan, user_details):
+    """Generate the diet, workout or combined PDF for a pair of plans, with charts"""
+    prefix, title = PLAN_PDF_KINDS[kind]
+    diet_charts = [("Daily Calories & Macros", nutrition_chart(diet_plan))] if kind != 'workout' else []
+    workout_charts = [("Weekly Training Volume", training_volume_chart(workout_plan))] if kind != 'diet' else []
+    
+    if kind == 'diet':
+        content = diet_plan
+    elif kind == 'workout':
+        content = workout_plan
+    else:
+        content = "# PERSONALIZED DIET PLAN\n\n" + diet_plan + "\n\n# PERSONALIZED WORKOUT PLAN\n\n" + workout_plan
+    
+    # Microseconds keep names unique when PDFs are generated concurrently
+    filename = f"{prefix}_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.pdf"
+    return generate_pdf(content, filename, title, user_details, charts=diet_charts + workout_charts)
+
+def render_plan_pdf(repository, kind, diet_plan_id, workout_plan_id, user_details):
+    """Generate a plan PDF from stored plans without caching it and return its path"""
+    diet_plan = repository.load_plan(diet_plan_id) if kind != 'workout' else None
+    workout_plan = repository.load_plan(workout_plan_id) if kind != 'diet' else None
+    return generate_plan_pdf(kind, diet_plan, workout_plan, user_details)
+
+def cached_plan_pdf(repository, kind, diet_plan_id, workout_plan_id, user_details):
+    """Return the path of a plan PDF, reusing an earlier export with identical content"""
+    # Only the plans that appear in the document are part of its cache key
+    diet_plan_id = diet_plan_id if kind != 'workout' else None
+    workout_plan_id = workout_plan_id if kind != 'diet' else None
+    cache_key = pdf_cache_key(kind, diet_plan_id, workout_plan_id, user_details)
+    
+    pdf_path = repository.get_cached_pdf(cache_key)
+    if pdf_path and os.path.exists(pdf_path):
+        return pdf_path
+    
+    pdf_path = render_plan_pdf(repository, kind, diet_plan_id, workout_plan_id, user_details)
+    repository.save_cached_pdf(cache_key, pdf_path)
+    return pdf_path
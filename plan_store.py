@@ -0,0 +1,306 @@
+import hashlib
+import json
+import os
+import sqlite3
+import zlib
+from abc import ABC, abstractmethod
+from datetime import datetime
+
+PLAN_TYPES = ("diet", "workout")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS plans (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    profile_hash TEXT NOT NULL,
+    plan_type TEXT NOT NULL,
+    content BLOB NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_plans_profile ON plans (profile_hash, plan_type, created_at);
+
+CREATE TABLE IF NOT EXISTS plan_sets (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL,
+    profile_hash TEXT NOT NULL,
+    personal_info TEXT NOT NULL,
+    diet_plan_id INTEGER NOT NULL REFERENCES plans (id),
+    workout_plan_id INTEGER NOT NULL REFERENCES plans (id),
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_plan_sets_user ON plan_sets (user_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_plan_sets_profile ON plan_sets (profile_hash);
+
+CREATE TABLE IF NOT EXISTS pdfs (
+    plan_set_id INTEGER NOT NULL REFERENCES plan_sets (id),
+    kind TEXT NOT NULL,
+    path TEXT NOT NULL,
+    PRIMARY KEY (plan_set_id, kind)
+);
+
+CREATE TABLE IF NOT EXISTS pdf_cache (
+    cache_key TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS request_log (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    profile_hash TEXT NOT NULL,
+    profile TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_request_log_profile ON request_log (profile_hash);
+"""
+
+
+def profile_hash(user_data):
+    """Return a stable hash of the inputs that determine a generated plan"""
+    canonical = json.dumps(user_data, sort_keys=True, default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def pdf_cache_key(kind, diet_plan_id, workout_plan_id, user_details):
+    """Return the cache key of a PDF export; identical inputs produce identical PDFs"""
+    canonical = json.dumps([kind, diet_plan_id, workout_plan_id, user_details])
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def compress_text(text):
+    """Compress plan text for storage"""
+    return zlib.compress(text.encode('utf-8'), 6)
+
+
+def decompress_text(blob):
+    """Restore plan text from its stored form"""
+    return zlib.decompress(blob).decode('utf-8')
+
+
+class PlanRepository(ABC):
+    """Storage interface for generated plans, their owners and exported PDFs
+
+    Plans are stored once per profile hash so identical requests can reuse them,
+    while plan sets record which user received which pair of plans.
+    """
+
+    @abstractmethod
+    def find_plan_id(self, profile_hash, plan_type):
+        """Return the newest stored plan id for a profile, or None"""
+
+    @abstractmethod
+    def save_plan(self, profile_hash, plan_type, content):
+        """Store plan text and return its id"""
+
+    @abstractmethod
+    def load_plan(self, plan_id):
+        """Return the text of a stored plan"""
+
+    @abstractmethod
+    def create_plan_set(self, user_id, profile_hash, personal_info, diet_plan_id, workout_plan_id):
+        """Record a pair of plans delivered to a user and return the plan set id"""
+
+    @abstractmethod
+    def get_plan_set(self, plan_set_id):
+        """Return plan set metadata (without plan text), or None"""
+
+    @abstractmethod
+    def history(self, user_id, limit=10):
+        """Return the user's most recent plan sets, newest first"""
+
+    @abstractmethod
+    def save_pdf_path(self, plan_set_id, kind, path):
+        """Remember where the PDF of a given kind was written for a plan set"""
+
+    @abstractmethod
+    def get_pdf_path(self, plan_set_id, kind):
+        """Return the stored PDF path for a plan set, or None"""
+
+    @abstractmethod
+    def get_cached_pdf(self, cache_key):
+        """Return the path of a previously generated PDF, or None"""
+
+    @abstractmethod
+    def save_cached_pdf(self, cache_key, path):
+        """Remember the path of a generated PDF under its cache key"""
+
+    @abstractmethod
+    def log_request(self, profile_hash, user_data):
+        """Record a plan request, used to find popular profiles"""
+
+    @abstractmethod
+    def popular_profiles(self, limit):
+        """Return [(user_data, request count)] for the most requested profiles"""
+
+    @abstractmethod
+    def get_profile(self, profile_hash):
+        """Return the logged user data for a profile hash, or None"""
+
+    @abstractmethod
+    def request_counts(self):
+        """Return {profile hash: request count} for all logged requests"""
+
+    def latest_plan_set(self, user_id):
+        """Return the user's most recent plan set, or None"""
+        recent = self.history(user_id, limit=1)
+        return recent[0] if recent else None
+
+
+class SQLitePlanRepository(PlanRepository):
+    """Plan repository backed by a local SQLite database"""
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+        finally:
+            conn.close()
+
+    def _connect(self):
+        # A short-lived connection per call keeps the repository safe to share
+        # between Streamlit script threads
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _query_one(self, sql, params):
+        conn = self._connect()
+        try:
+            return conn.execute(sql, params).fetchone()
+        finally:
+            conn.close()
+
+    def _execute(self, sql, params):
+        conn = self._connect()
+        try:
+            with conn:
+                return conn.execute(sql, params).lastrowid
+        finally:
+            conn.close()
+
+    def find_plan_id(self, profile_hash, plan_type):
+        row = self._query_one(
+            "SELECT id FROM plans WHERE profile_hash = ? AND plan_type = ? "
+            "ORDER BY created_at DESC, id DESC LIMIT 1",
+            (profile_hash, plan_type)
+        )
+        return row["id"] if row else None
+
+    def save_plan(self, profile_hash, plan_type, content):
+        return self._execute(
+            "INSERT INTO plans (profile_hash, plan_type, content, created_at) VALUES (?, ?, ?, ?)",
+            (profile_hash, plan_type, compress_text(content), datetime.now().isoformat())
+        )
+
+    def load_plan(self, plan_id):
+        row = self._query_one("SELECT content FROM plans WHERE id = ?", (plan_id,))
+        return decompress_text(row["content"]) if row else None
+
+    def create_plan_set(self, user_id, profile_hash, personal_info, diet_plan_id, workout_plan_id):
+        return self._execute(
+            "INSERT INTO plan_sets (user_id, profile_hash, personal_info, diet_plan_id, workout_plan_id, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (user_id, profile_hash, json.dumps(personal_info), diet_plan_id, workout_plan_id,
+             datetime.now().isoformat())
+        )
+
+    @staticmethod
+    def _plan_set_from_row(row):
+        return {
+            'id': row["id"],
+            'user_id': row["user_id"],
+            'profile_hash': row["profile_hash"],
+            'personal_info': json.loads(row["personal_info"]),
+            'diet_plan_id': row["diet_plan_id"],
+            'workout_plan_id': row["workout_plan_id"],
+            'created_at': row["created_at"]
+        }
+
+    def get_plan_set(self, plan_set_id):
+        row = self._query_one("SELECT * FROM plan_sets WHERE id = ?", (plan_set_id,))
+        return self._plan_set_from_row(row) if row else None
+
+    def history(self, user_id, limit=10):
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT * FROM plan_sets WHERE user_id = ? ORDER BY created_at DESC, id DESC LIMIT ?",
+                (user_id, limit)
+            ).fetchall()
+        finally:
+            conn.close()
+        return [self._plan_set_from_row(row) for row in rows]
+
+    def save_pdf_path(self, plan_set_id, kind, path):
+        self._execute(
+            "INSERT OR REPLACE INTO pdfs (plan_set_id, kind, path) VALUES (?, ?, ?)",
+            (plan_set_id, kind, path)
+        )
+
+    def get_pdf_path(self, plan_set_id, kind):
+        row = self._query_one(
+            "SELECT path FROM pdfs WHERE plan_set_id = ? AND kind = ?", (plan_set_id, kind)
+        )
+        return row["path"] if row else None
+
+    def get_cached_pdf(self, cache_key):
+        row = self._query_one("SELECT path FROM pdf_cache WHERE cache_key = ?", (cache_key,))
+        return row["path"] if row else None
+
+    def save_cached_pdf(self, cache_key, path):
+        self._execute(
+            "INSERT OR REPLACE INTO pdf_cache (cache_key, path, created_at) VALUES (?, ?, ?)",
+            (cache_key, path, datetime.now().isoformat())
+        )
+
+    def log_request(self, profile_hash, user_data):
+        self._execute(
+            "INSERT INTO request_log (profile_hash, profile, created_at) VALUES (?, ?, ?)",
+            (profile_hash, json.dumps(user_data, sort_keys=True, default=str), datetime.now().isoformat())
+        )
+
+    def popular_profiles(self, limit):
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT profile, COUNT(*) AS requests FROM request_log "
+                "GROUP BY profile_hash ORDER BY requests DESC LIMIT ?",
+                (limit,)
+            ).fetchall()
+        finally:
+            conn.close()
+        return [(json.loads(row["profile"]), row["requests"]) for row in rows]
+
+    def get_profile(self, profile_hash):
+        row = self._query_one(
+            "SELECT profile FROM request_log WHERE profile_hash = ? ORDER BY id DESC LIMIT 1",
+            (profile_hash,)
+        )
+        return json.loads(row["profile"]) if row else None
+
+    def request_counts(self):
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT profile_hash, COUNT(*) AS requests FROM request_log GROUP BY profile_hash"
+            ).fetchall()
+        finally:
+            conn.close()
+        return {row["profile_hash"]: row["requests"] for row in rows}
+
+
+# Available storage backends, selected with the PLAN_STORE_BACKEND setting
+BACKENDS = {
+    'sqlite': lambda: SQLitePlanRepository(os.getenv("PLAN_STORE_PATH", os.path.join("data", "plans.db"))),
+}
+
+
+def get_repository(backend=None):
+    """Create the configured plan repository (SQLite by default)"""
+    backend = backend or os.getenv("PLAN_STORE_BACKEND", "sqlite")
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown plan store backend: {backend}")
+    return BACKENDS[backend]()
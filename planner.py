@@ -0,0 +1,223 @@
+import os
+import threading
+import google.generativeai as genai
+
+from model_router import ModelRouter
+from stub_model import StubModel
+
+# Used for token counting; generation models are chosen by model_router
+MODEL_NAME = 'gemini-2.5-flash'
+
+# Static instructions, sent once as a system instruction instead of being
+# repeated in every prompt
+DIET_INSTRUCTIONS = """You create detailed, personalized 7-day diet plans.
+The user's profile follows as compact key:value lines; missing keys mean "none".
+
+The diet plan should:
+1. Include exactly meals_per_day meals per day: breakfast, lunch and dinner, with any extra meals as snacks
+2. Specify portion sizes and approximate calories for each meal, e.g. "**Breakfast** (450 calories)"
+3. Ensure nutritional balance and list protein, carbs and fat in grams for each meal
+4. Respect the diet type, foods to avoid and all allergies
+5. Take medical conditions and medications (including food interactions) into account
+6. Support the user's goal
+7. Include a brief explanation of why this plan suits their needs
+8. Include a shopping list for the ingredients needed
+
+Format the response in a clean, organized way with clear headings for each day ("**Day 1**") and meal."""
+
+WORKOUT_INSTRUCTIONS = """You create detailed, personalized 7-day workout plans.
+The user's profile follows as compact key:value lines; missing keys mean "none".
+
+The workout plan should:
+1. Include appropriate exercises for each day with sets, reps and rest periods, e.g. "3 sets of 12 reps"
+2. Have a mix of cardio, strength and flexibility exercises, favouring the user's preferences
+3. Include warm-up and cool-down routines, fitting within minutes_per_day
+4. Only use the available equipment and be appropriate for the experience level
+5. Respect medical conditions, medications and avoid aggravating any injuries
+6. Support the user's goal
+7. Include a brief explanation of why this plan suits their needs
+8. Include rest days as appropriate
+
+Format the response in a clean, organized way with clear headings for each day ("**Day 1**") and exercise."""
+
+# (user_data key, prompt key) pairs making up the per-user part of each prompt
+DIET_FIELDS = [
+    ('age', 'age'),
+    ('gender', 'gender'),
+    ('height', 'height_cm'),
+    ('weight', 'weight_kg'),
+    ('activity_level', 'activity'),
+    ('diet_goal', 'goal'),
+    ('dietary_restrictions', 'diet_type'),
+    ('food_preferences', 'avoid'),
+    ('allergies', 'allergies'),
+    ('meals_per_day', 'meals_per_day'),
+    ('medical_conditions', 'medical'),
+    ('medications', 'medications'),
+]
+
+WORKOUT_FIELDS = [
+    ('age', 'age'),
+    ('gender', 'gender'),
+    ('height', 'height_cm'),
+    ('weight', 'weight_kg'),
+    ('activity_level', 'activity'),
+    ('fitness_goal', 'goal'),
+    ('available_equipment', 'equipment'),
+    ('time_available', 'minutes_per_day'),
+    ('exercise_experience', 'experience'),
+    ('exercise_preferences', 'preferences'),
+    ('medical_conditions', 'medical'),
+    ('medications', 'medications'),
+    ('injuries', 'injuries'),
+]
+
+PLAN_SPECS = {
+    'diet': (DIET_INSTRUCTIONS, DIET_FIELDS),
+    'workout': (WORKOUT_INSTRUCTIONS, WORKOUT_FIELDS),
+}
+
+_models = {}
+_models_lock = threading.Lock()
+_router = None
+_router_lock = threading.Lock()
+
+
+def stub_enabled():
+    """True if PLANNER_STUB_MODEL asks for canned responses instead of Gemini (local testing, load tests)"""
+    return os.getenv("PLANNER_STUB_MODEL", "").lower() in ("1", "true", "yes")
+
+
+def configure(api_key):
+    """Configure the Gemini client with an API key"""
+    genai.configure(api_key=api_key)
+
+
+def compact_profile(user_data, fields):
+    """Render the user-specific part of a prompt as compact key:value lines"""
+    lines = []
+    for data_key, prompt_key in fields:
+        value = user_data.get(data_key)
+        if value is None or str(value).strip() in ('', 'None'):
+            continue
+        # Collapse multi-line free text so each field stays on one line
+        value = ' '.join(str(value).split())
+        lines.append(f"{prompt_key}:{value}")
+    return "\n".join(lines)
+
+
+def build_prompt(plan_type, user_data):
+    """Return (system instruction, per-user prompt) for a plan type"""
+    instructions, fields = PLAN_SPECS[plan_type]
+    return instructions, compact_profile(user_data, fields)
+
+
+def _create_model(plan_type, model_name):
+    """Create a model with the plan type's instructions attached"""
+    if stub_enabled():
+        return StubModel(plan_type)
+    instructions, _ = PLAN_SPECS[plan_type]
+    return genai.GenerativeModel(model_name, system_instruction=instructions)
+
+
+def get_model(plan_type, model_name=MODEL_NAME):
+    """Return a reusable model handle for a plan type"""
+    key = (plan_type, model_name)
+    with _models_lock:
+        if key not in _models:
+            _models[key] = _create_model(plan_type, model_name)
+        return _models[key]
+
+
+def get_router():
+    """Return the shared router that picks the model per request, with fallback and hedging
+
+    Created on first use so its worker count comes from a .env loaded after import.
+    """
+    global _router
+    with _router_lock:
+        if _router is None:
+            _router = ModelRouter(get_model)
+        return _router
+
+
+def generate_plan(plan_type, user_data):
+    """Generate a plan of the given type ('diet' or 'workout') and return its text"""
+    _, prompt = build_prompt(plan_type, user_data)
+    return get_router().generate(plan_type, prompt)
+
+
+def stream_plan_async(plan_type, user_data):
+    """Async iterator over a plan's text chunks as the model produces them"""
+    _, prompt = build_prompt(plan_type, user_data)
+    return get_router().stream_async(plan_type, prompt)
+
+
+def generate_diet_plan(user_data):
+    """Generate a diet plan based on user data using Google's Generative AI"""
+    return generate_plan('diet', user_data)
+
+
+def generate_workout_plan(user_data):
+    """Generate a workout plan based on user data using Google's Generative AI"""
+    return generate_plan('workout', user_data)
+
+
+def token_report(user_data, model_name=MODEL_NAME):
+    """Count input tokens for each prompt variant
+
+    Returns {plan_type: {'instructions': n, 'profile': n, 'total': n}}, where
+    'instructions' is the static part sent as the system instruction.
+    """
+    model = genai.GenerativeModel(model_name)
+    report = {}
+    for plan_type in PLAN_SPECS:
+        instructions, prompt = build_prompt(plan_type, user_data)
+        instruction_tokens = model.count_tokens(instructions).total_tokens
+        profile_tokens = model.count_tokens(prompt).total_tokens
+        report[plan_type] = {
+            'instructions': instruction_tokens,
+            'profile': profile_tokens,
+            'total': instruction_tokens + profile_tokens
+        }
+    return report
+
+
+# Sidebar choices, shared with the cache warm-up job
+ACTIVITY_LEVELS = ["Sedentary", "Lightly Active", "Moderately Active", "Very Active", "Extremely Active"]
+DIET_GOALS = ["Weight Loss", "Weight Maintenance", "Weight Gain", "Muscle Building", "Improved Energy", "Better Health"]
+FITNESS_GOALS = ["Weight Loss", "Muscle Building", "Endurance", "Flexibility", "General Fitness", "Strength"]
+DIET_TYPES = ["No Restrictions", "Vegetarian", "Vegan", "Pescatarian", "Keto", "Paleo", "Mediterranean"]
+EXPERIENCE_LEVELS = ["Beginner", "Intermediate", "Advanced"]
+
+# Sidebar defaults, used for the token report and cache warm-up
+DEFAULT_USER_DATA = {
+    'age': 30,
+    'gender': 'Male',
+    'height': 170,
+    'weight': 70,
+    'activity_level': 'Moderately Active',
+    'diet_goal': 'Weight Loss',
+    'fitness_goal': 'Weight Loss',
+    'dietary_restrictions': 'No Restrictions',
+    'food_preferences': '',
+    'allergies': 'None',
+    'meals_per_day': 3,
+    'available_equipment': 'None',
+    'time_available': 45,
+    'exercise_experience': 'Beginner',
+    'exercise_preferences': 'Cardio, Strength Training',
+    'medical_conditions': '',
+    'medications': '',
+    'injuries': ''
+}
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    configure(os.getenv("GOOGLE_API_KEY"))
+    print(f"{'Prompt':<10}{'Instructions':>14}{'Profile':>10}{'Total':>8}")
+    for plan_type, counts in token_report(DEFAULT_USER_DATA).items():
+        print(f"{plan_type:<10}{counts['instructions']:>14}{counts['profile']:>10}{counts['total']:>8}")
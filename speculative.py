@@ -0,0 +1,151 @@
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import planner
+from plan_store import PLAN_TYPES, profile_hash
+
+# Defaults for SPECULATIVE_DEBOUNCE_SECONDS and SPECULATIVE_MAX_PER_HOUR
+DEBOUNCE_SECONDS = 3
+MAX_PER_HOUR = 20
+
+
+def enabled():
+    """True if SPECULATIVE_PREFETCH is set
+
+    Speculative prefetch is opt-in because it spends model calls on plans that
+    may never be requested.
+    """
+    return os.getenv("SPECULATIVE_PREFETCH", "").lower() in ("1", "true", "yes")
+
+
+def missing_plan_types(repository, user_data):
+    """Return the plan types not yet stored for this profile"""
+    key = profile_hash(user_data)
+    return [plan_type for plan_type in PLAN_TYPES if repository.find_plan_id(key, plan_type) is None]
+
+
+def generate_missing_plans(repository, user_data):
+    """Generate and store any plans missing from the repository for this profile"""
+    key = profile_hash(user_data)
+    for plan_type in missing_plan_types(repository, user_data):
+        repository.save_plan(key, plan_type, planner.generate_plan(plan_type, user_data))
+
+
+class SpeculativePrefetcher:
+    """Starts plan generation in the background once a session's inputs settle
+
+    Each session has at most one pending profile. A new profile cancels the
+    previous one while it is still waiting, either for the debounce timer or
+    for a free worker; generations already running finish and land in the
+    plan repository, where they can still serve a later identical request.
+    """
+
+    def __init__(self, repository, debounce_seconds=None, max_per_hour=None, max_workers=2):
+        self.repository = repository
+        if debounce_seconds is None:
+            debounce_seconds = float(os.getenv("SPECULATIVE_DEBOUNCE_SECONDS", DEBOUNCE_SECONDS))
+        if max_per_hour is None:
+            max_per_hour = int(os.getenv("SPECULATIVE_MAX_PER_HOUR", MAX_PER_HOUR))
+        self.debounce_seconds = debounce_seconds
+        self.max_per_hour = max_per_hour
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="speculative")
+        self._lock = threading.Lock()
+        self._timers = {}  # session id -> (profile hash, debounce timer)
+        self._futures = {}  # profile hash -> future of a submitted generation
+        self._runs = {}  # session id -> (profile hash, future) of the generation it submitted
+        self._started = deque()  # submit times of generations in the last hour
+
+    def schedule(self, session_id, user_data):
+        """Note the session's current inputs; generation starts if they stay unchanged"""
+        key = profile_hash(user_data)
+        self._cancel_run(session_id, keep=key)
+        with self._lock:
+            pending = self._timers.get(session_id)
+            if pending and pending[0] == key:
+                return
+            if pending:
+                # Inputs changed before the debounce window ended
+                pending[1].cancel()
+            if key in self._futures:
+                self._timers.pop(session_id, None)
+                return
+            timer = threading.Timer(self.debounce_seconds, self._start, (session_id, key, user_data))
+            timer.daemon = True
+            self._timers[session_id] = (key, timer)
+            timer.start()
+
+    def _within_budget(self):
+        now = time.monotonic()
+        while self._started and now - self._started[0] > 3600:
+            self._started.popleft()
+        return len(self._started) < self.max_per_hour
+
+    def _start(self, session_id, key, user_data):
+        with self._lock:
+            pending = self._timers.get(session_id)
+            if not pending or pending[0] != key:
+                return
+            del self._timers[session_id]
+            if key in self._futures or not self._within_budget():
+                return
+            if not missing_plan_types(self.repository, user_data):
+                return
+            submitted_at = time.monotonic()
+            self._started.append(submitted_at)
+            future = self._executor.submit(generate_missing_plans, self.repository, user_data)
+            self._futures[key] = future
+            self._runs[session_id] = (key, future)
+        future.add_done_callback(lambda done: self._forget(key, done, submitted_at))
+
+    def _forget(self, key, future, submitted_at):
+        with self._lock:
+            if self._futures.get(key) is future:
+                del self._futures[key]
+            for session_id, run in list(self._runs.items()):
+                if run[1] is future:
+                    del self._runs[session_id]
+            if future.cancelled() and submitted_at in self._started:
+                # Cancelled while queued, so it never called the model
+                self._started.remove(submitted_at)
+
+    def _cancel_run(self, session_id, keep=None):
+        """Cancel the session's generation if it is still queued, unless it is for profile keep"""
+        with self._lock:
+            run = self._runs.get(session_id)
+            if not run or run[0] == keep:
+                return
+            del self._runs[session_id]
+        # Outside the lock: cancelling runs the done callback, which takes it
+        run[1].cancel()
+
+    def cancel(self, session_id):
+        """Drop the session's pending profile, if its generation has not started yet"""
+        with self._lock:
+            pending = self._timers.pop(session_id, None)
+        if pending:
+            pending[1].cancel()
+        self._cancel_run(session_id)
+
+    def claim(self, session_id, user_data, timeout=None):
+        """Called when the user asks for plans: wait for a matching speculative run
+
+        Cancels the session's pending profile. Only a run that has already
+        started is waited for; one still queued behind other sessions' runs is
+        cancelled, since generating directly is faster. Returns True if a
+        speculative generation for these inputs has finished.
+        """
+        self.cancel(session_id)
+        key = profile_hash(user_data)
+        with self._lock:
+            future = self._futures.get(key)
+        if future is None or future.cancel():
+            return False
+        try:
+            future.result(timeout=timeout)
+            return True
+        except Exception:
+            # The regular generation path reports errors to the user
+            return False
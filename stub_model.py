@@ -0,0 +1,67 @@
+import asyncio
+import os
+import time
+
+# Default simulated model latency for local load tests (STUB_LATENCY_SECONDS)
+STUB_LATENCY_SECONDS = 2
+STUB_CHUNKS = 20
+
+DIET_DAY = """**Day {day}**
+**Breakfast** (450 calories)
+- Oatmeal with berries and Greek yogurt (Protein: 20g, Carbs: 60g, Fat: 10g)
+**Lunch** (600 calories)
+- Grilled chicken salad with quinoa (Protein: 40g, Carbs: 50g, Fat: 20g)
+**Dinner** (650 calories)
+- Baked salmon, brown rice and vegetables (Protein: 45g, Carbs: 55g, Fat: 22g)
+**Snack** (200 calories)
+- Apple with almond butter (Protein: 5g, Carbs: 25g, Fat: 9g)
+"""
+
+WORKOUT_DAY = """**Day {day}: Full Body**
+- Warm-up: 10 minutes light cardio
+- Squats: 3 sets of 12 reps
+- Push-ups: 3 sets of 10-12 reps
+- Dumbbell rows: 3x12
+- Cool-down: 5 minutes stretching
+"""
+
+
+class StubResponse:
+    """Mimics a Gemini response (or a chunk of a streamed one)"""
+
+    def __init__(self, text):
+        self.text = text
+
+
+class StubModel:
+    """Drop-in replacement for a Gemini model that returns a canned 7-day plan
+
+    Enabled with PLANNER_STUB_MODEL=1 so the app and API can be exercised and
+    load-tested without an API key or model spend.
+    """
+
+    def __init__(self, plan_type):
+        self.plan_type = plan_type
+        self.latency = float(os.getenv("STUB_LATENCY_SECONDS", STUB_LATENCY_SECONDS))
+
+    def _plan_text(self, prompt):
+        day_template = DIET_DAY if self.plan_type == 'diet' else WORKOUT_DAY
+        days = "\n".join(day_template.format(day=day) for day in range(1, 8))
+        return f"**Why this plan suits you:** generated for\n{prompt}\n\n{days}"
+
+    def generate_content(self, prompt, **kwargs):
+        time.sleep(self.latency)
+        return StubResponse(self._plan_text(prompt))
+
+    async def generate_content_async(self, prompt, stream=False, **kwargs):
+        text = self._plan_text(prompt)
+        if not stream:
+            await asyncio.sleep(self.latency)
+            return StubResponse(text)
+        return self._stream_async(text)
+
+    async def _stream_async(self, text):
+        size = len(text) // STUB_CHUNKS + 1
+        for start in range(0, len(text), size):
+            await asyncio.sleep(self.latency / STUB_CHUNKS)
+            yield StubResponse(text[start:start + size])
@@ -0,0 +1,132 @@
+import asyncio
+
+import httpx
+import pytest
+from starlette.exceptions import HTTPException
+
+import api
+import planner
+
+PROFILE = {
+    'age': 30,
+    'gender': "Male",
+    'height': 170,
+    'weight': 70,
+    'activity_level': "Sedentary",
+    'diet_goal': "Weight Loss",
+    'fitness_goal': "Strength",
+}
+
+
+def test_parse_profile_fills_defaults():
+    user_data, name = api.parse_profile(dict(PROFILE, name="Ann"))
+    assert user_data == dict(planner.DEFAULT_USER_DATA, **PROFILE)
+    assert name == "Ann"
+
+
+def test_parse_profile_converts_values():
+    user_data, _ = api.parse_profile(dict(PROFILE, age=42.0, allergies=["Nuts", "Dairy"]))
+    assert user_data['age'] == 42
+    assert isinstance(user_data['age'], int)
+    assert user_data['allergies'] == "Nuts, Dairy"
+
+
+def test_parse_profile_caps_free_text():
+    user_data, name = api.parse_profile(dict(PROFILE, medical_conditions="x" * 10000, name="n" * 200))
+    assert len(user_data['medical_conditions']) == api.MAX_TEXT_CHARS
+    assert len(name) == api.MAX_NAME_CHARS
+
+
+@pytest.mark.parametrize("payload, message", [
+    ([], "Expected a JSON object"),
+    ({}, "age is required"),
+    (dict(PROFILE, age=12), "age must be between 15 and 100"),
+    (dict(PROFILE, age="old"), "age must be an integer"),
+    (dict(PROFILE, age="42"), "age must be an integer"),
+    (dict(PROFILE, age=30.9), "age must be an integer"),
+    (dict(PROFILE, age=True), "age must be an integer"),
+    (dict(PROFILE, food_preferences={'avoid': "fish"}), "food_preferences must be a string"),
+    (dict(PROFILE, allergies=["Nuts", 3]), "allergies must be a list of strings"),
+    (dict(PROFILE, name=["Ann"]), "name must be a string"),
+    (dict(PROFILE, gender="Robot"), "gender must be one of: Male, Female, Other"),
+    (dict(PROFILE, meals_per_day=9), "meals_per_day must be between 3 and 6"),
+    (dict(PROFILE, exercise_experience="Expert"), "exercise_experience must be one of"),
+])
+def test_parse_profile_rejects_invalid_input(payload, message):
+    with pytest.raises(HTTPException) as error:
+        api.parse_profile(payload)
+    assert error.value.status_code == 422
+    assert message in error.value.detail
+
+
+@pytest.fixture
+def generations(tmp_path, monkeypatch):
+    """Fake model streams, recording each (plan type, age) generated"""
+    monkeypatch.setenv("PLAN_STORE_PATH", str(tmp_path / "plans.db"))
+    monkeypatch.setenv("PLANNER_STUB_MODEL", "1")
+    calls = []
+
+    async def fake_stream(plan_type, user_data):
+        calls.append((plan_type, user_data['age']))
+        for part in ("**Day 1**\n", "Rest"):
+            await asyncio.sleep(0.1)
+            yield part
+
+    monkeypatch.setattr(planner, "stream_plan_async", fake_stream)
+    return calls
+
+
+def run_client(requests):
+    """Run requests(client) against the app, with its lifespan, in a fresh event loop"""
+    async def main():
+        async with api.app.router.lifespan_context(api.app):
+            transport = httpx.ASGITransport(app=api.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await requests(client)
+    return asyncio.run(main())
+
+
+def test_concurrent_streams_share_one_generation(generations):
+    async def requests(client):
+        key = (await client.post("/plans", json=PROFILE)).json()['profile_hash']
+        url = f"/plans/{key}/diet/stream"
+        streams = await asyncio.gather(*(client.get(url) for _ in range(5)))
+        cached = await client.get(url)
+        return streams, cached
+
+    streams, cached = run_client(requests)
+    assert generations == [("diet", 30)]
+    for response in streams:
+        assert response.status_code == 200
+        assert '"**Day 1**\\n"' in response.text
+        assert '"cached": false' in response.text
+    assert '"cached": true' in cached.text
+
+
+def test_full_queue_is_rejected(generations, monkeypatch):
+    monkeypatch.setenv("API_MAX_CONCURRENCY", "1")
+    monkeypatch.setenv("API_MAX_WAITING", "0")
+
+    async def requests(client):
+        keys = []
+        for age in (30, 40):
+            response = await client.post("/plans", json=dict(PROFILE, age=age))
+            keys.append(response.json()['profile_hash'])
+        return await asyncio.gather(*(client.get(f"/plans/{key}/diet/stream") for key in keys))
+
+    responses = run_client(requests)
+    # Whichever request is admitted first gets the only place
+    assert sorted(response.status_code for response in responses) == [200, 503]
+    rejected = next(response for response in responses if response.status_code == 503)
+    assert rejected.headers['Retry-After'] == api.RETRY_AFTER_SECONDS
+    assert len(generations) == 1
+
+
+def test_unknown_profile_and_plan_type(generations):
+    async def requests(client):
+        return (await client.get("/plans/missing/diet/stream"),
+                await client.get("/plans/missing/lunch/stream"))
+
+    missing, unknown = run_client(requests)
+    assert missing.status_code == 404
+    assert unknown.status_code == 404
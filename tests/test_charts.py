@@ -0,0 +1,109 @@
+import pytest
+
+import charts
+
+DIET_PLAN = """# 7-Day Diet Plan
+
+**Day 1**
+**Breakfast** (450 calories)
+- Oats: Protein: 15g, Carbs: 60g, Fat: 10g
+**Lunch** (600 kcal)
+- Protein 40g, Carbohydrates 55g, Fats 20g
+Daily total: 1050 calories
+
+**Day 2**
+**Breakfast** (500 cal)
+"""
+
+WORKOUT_PLAN = """**Day 1**
+- Warm-up: 10 minutes
+- Squats: 3 sets of 10-12 reps
+- Push-ups: 3x12
+**Day 2**
+- Rest
+**Day 3**
+- Jog: 20-40 min
+**Day 1**
+- Duplicate heading ignored: 5x5
+"""
+
+
+def test_split_days_keeps_first_occurrence_in_order():
+    days = charts.split_days(WORKOUT_PLAN)
+    assert [label for label, _ in days] == ["Day 1", "Day 2", "Day 3"]
+    assert "- Push-ups: 3x12" in days[0][1]
+
+
+def test_split_days_recognises_weekday_headings():
+    days = charts.split_days("## Monday\nRun\n### TUESDAY - Legs\nSquats")
+    assert [label for label, _ in days] == ["Monday", "Tuesday"]
+
+
+def test_split_days_ignores_text_before_first_day():
+    assert charts.split_days("No headings here\nat all") == []
+
+
+def test_nutrition_dataframe_sums_meals_and_skips_totals():
+    df = charts.nutrition_dataframe(DIET_PLAN).set_index('Day')
+    assert df.loc["Day 1", 'Calories'] == 1050
+    assert df.loc["Day 1", 'Protein'] == 55
+    assert df.loc["Day 1", 'Carbs'] == 115
+    assert df.loc["Day 1", 'Fat'] == 30
+    assert df.loc["Day 2", 'Calories'] == 500
+
+
+@pytest.mark.parametrize("line, reps", [
+    ("Squats: 3 sets of 12 reps", 36),
+    ("Squats: 3 sets of 10-12 reps", 33),
+    ("Push-ups: 3x12", 36),
+    ("Lunges: 4 × 8 repetitions", 32),
+    ("Plank: hold until failure", 0),
+    ("Dumbbell curls: 3 x 10 lb dumbbells", 0),
+    ("Plank: 2x 30 seconds", 0),
+    ("Rows: 4 sets of 8 reps with 20 kg", 32),
+])
+def test_training_volume_parses_sets_and_reps(line, reps):
+    df = charts.training_volume_dataframe(f"**Day 1**\n{line}")
+    assert df.loc[0, 'Reps'] == reps
+
+
+def test_training_volume_counts_minutes_without_sets():
+    df = charts.training_volume_dataframe(WORKOUT_PLAN).set_index('Day')
+    assert df.loc["Day 1", 'Reps'] == 69
+    assert df.loc["Day 1", 'Minutes'] == 10
+    assert df.loc["Day 2", 'Reps'] == 0
+    assert df.loc["Day 3", 'Minutes'] == 30
+
+
+def test_empty_plan_gives_no_chart():
+    assert charts.nutrition_chart("no days here") is None
+
+
+def test_calories_with_thousands_separators():
+    df = charts.nutrition_dataframe("**Day 1**\n**Dinner** (1,050 calories)\n**Snack** (2,100kcal)")
+    assert df.loc[0, 'Calories'] == 3150
+
+
+def test_closing_sections_are_not_counted_towards_the_last_day():
+    plan = DIET_PLAN + """
+**Why this plan suits you**
+This plan gives you about 1,800 calories per day.
+
+## Shopping List
+- Oats 500 calories per bag
+"""
+    days = charts.split_days(plan)
+    assert [label for label, _ in days] == ["Day 1", "Day 2"]
+    df = charts.nutrition_dataframe(plan).set_index('Day')
+    assert df.loc["Day 2", 'Calories'] == 500
+
+
+def test_day_notes_do_not_end_the_day():
+    df = charts.nutrition_dataframe("**Day 1**\n- Note: drink water\n**Lunch** (600 calories)")
+    assert df.loc[0, 'Calories'] == 600
+
+
+def test_minutes_are_counted_alongside_sets():
+    df = charts.training_volume_dataframe("**Day 1**\n- Jog 20 minutes then 2x 30 seconds sprints")
+    assert df.loc[0, 'Minutes'] == 20
+    assert df.loc[0, 'Reps'] == 0
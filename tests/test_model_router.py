@@ -0,0 +1,182 @@
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import model_router
+from model_router import ModelRouter
+
+
+def response(text, finish_reason="STOP"):
+    candidate = SimpleNamespace(finish_reason=SimpleNamespace(name=finish_reason))
+    return SimpleNamespace(text=text, candidates=[candidate])
+
+
+class FakeModel:
+    """Returns a canned response after a delay, or raises the given error"""
+
+    def __init__(self, text="plan", delay=0.0, error=None, finish_reason="STOP"):
+        self.text = text
+        self.delay = delay
+        self.error = error
+        self.finish_reason = finish_reason
+        self.calls = 0
+
+    def generate_content(self, prompt, **kwargs):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return response(self.text, self.finish_reason)
+
+    async def generate_content_async(self, prompt, stream=False, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error:
+            raise self.error
+
+        async def chunks():
+            yield response(self.text[:2], None)
+            yield response(self.text[2:], self.finish_reason)
+        return chunks()
+
+
+@pytest.fixture(autouse=True)
+def chain(monkeypatch):
+    monkeypatch.setenv("MODEL_CHAIN_DIET_SMALL", "primary,backup")
+    monkeypatch.setenv("HEDGE_DEFAULT_SECONDS", "0.1")
+
+
+def router_for(models, max_workers=8):
+    return ModelRouter(lambda plan_type, model_name: models[model_name], max_workers=max_workers)
+
+
+def test_first_model_answers():
+    models = {'primary': FakeModel("primary plan"), 'backup': FakeModel("backup plan")}
+    assert router_for(models).generate("diet", "age:30") == "primary plan"
+    assert models['backup'].calls == 0
+
+
+def test_falls_back_on_error():
+    models = {'primary': FakeModel(error=RuntimeError("quota")), 'backup': FakeModel("backup plan")}
+    assert router_for(models).generate("diet", "age:30") == "backup plan"
+
+
+def test_truncated_response_falls_back():
+    models = {'primary': FakeModel("half a plan", finish_reason="MAX_TOKENS"), 'backup': FakeModel("backup plan")}
+    assert router_for(models).generate("diet", "age:30") == "backup plan"
+
+
+def test_all_models_failing_raises():
+    models = {'primary': FakeModel(error=RuntimeError("quota")), 'backup': FakeModel("  ")}
+    with pytest.raises(RuntimeError, match="primary: quota; backup: empty response"):
+        router_for(models).generate("diet", "age:30")
+
+
+def test_slow_request_is_hedged():
+    models = {'primary': FakeModel("primary plan", delay=1.0), 'backup': FakeModel("backup plan")}
+    started = time.monotonic()
+    assert router_for(models).generate("diet", "age:30") == "backup plan"
+    assert time.monotonic() - started < 0.8
+
+
+def test_no_hedge_when_hedge_pool_is_saturated():
+    models = {'primary': FakeModel("primary plan", delay=0.4), 'backup': FakeModel("backup plan"),
+              'busy': FakeModel(delay=0.6)}
+    router = router_for(models, max_workers=1)
+    assert router.hedge_workers == 1
+    # Another request's backup occupies the only hedge worker
+    router._submit(model_router.Attempt("busy", 0), "diet", "age:30", None, hedge=True)
+    assert router.generate("diet", "age:30") == "primary plan"
+    assert models['backup'].calls == 0
+
+
+def test_hedge_losers_do_not_take_primary_workers():
+    models = {'primary': FakeModel("primary plan", delay=0.3), 'backup': FakeModel("backup plan", delay=2.0)}
+    router = router_for(models, max_workers=1)
+    # Hedges after 0.1s; the slow backup loses and is left running
+    assert router.generate("diet", "age:30") == "primary plan"
+    assert models['backup'].calls == 1
+    models['primary'].delay = 0
+    started = time.monotonic()
+    assert router.generate("diet", "age:30") == "primary plan"
+    assert time.monotonic() - started < 0.5
+
+
+def test_worker_count_is_read_from_the_environment(monkeypatch):
+    monkeypatch.setenv("MODEL_MAX_WORKERS", "12")
+    router = ModelRouter(lambda plan_type, model_name: None)
+    assert router.max_workers == 12
+    assert router.hedge_workers == 3
+
+
+def test_queued_time_does_not_count_towards_hedge_delay(monkeypatch):
+    monkeypatch.setenv("HEDGE_DEFAULT_SECONDS", "0.3")
+    models = {'primary': FakeModel("primary plan", delay=0.2), 'backup': FakeModel("backup plan")}
+    router = router_for(models, max_workers=2)
+    release = threading.Event()
+    # Occupy one worker so the request below waits 0.4s in the queue first
+    blocker = router._executor.submit(release.wait)
+    occupied = router._executor.submit(time.sleep, 0.4)
+    result = router.generate("diet", "age:30")
+    release.set()
+    # Let any queued backup run before counting calls
+    router._executor.shutdown(wait=True)
+    assert result == "primary plan"
+    assert models['backup'].calls == 0
+
+
+def test_hedge_delay_uses_p95_once_enough_samples():
+    router = router_for({})
+    assert router.hedge_delay("primary") == 0.1
+    for seconds in range(1, model_router.HEDGE_MIN_SAMPLES + 1):
+        router.latencies.record("primary", seconds)
+    assert router.hedge_delay("primary") == model_router.HEDGE_MIN_SAMPLES
+
+
+def test_long_prompts_use_the_large_chain(monkeypatch):
+    monkeypatch.setenv("LARGE_PROMPT_CHARS", "10")
+    monkeypatch.setenv("MODEL_CHAIN_DIET_LARGE", "strong")
+    router = router_for({})
+    assert router.route("diet", "x" * 11) == ["strong"]
+    assert router.route("diet", "x" * 10) == ["primary", "backup"]
+
+
+def test_generation_config_caps_temperature(monkeypatch):
+    monkeypatch.setenv("TEMPERATURE_CAP", "0.5")
+    config = router_for({}).generation_config("workout", temperature=1.0)
+    assert config.temperature == 0.5
+    assert config.max_output_tokens == model_router.MAX_OUTPUT_TOKENS['workout']
+
+
+def test_truncated_stream_raises_after_its_chunks():
+    models = {'primary': FakeModel("half a plan", finish_reason="MAX_TOKENS"), 'backup': FakeModel()}
+
+    async def collect():
+        chunks = []
+        with pytest.raises(ValueError, match="truncated"):
+            async for chunk in router_for(models).stream_async("diet", "age:30"):
+                chunks.append(chunk)
+        return chunks
+
+    assert asyncio.run(collect()) == ["ha", "lf a plan"]
+    assert models['backup'].calls == 0
+
+
+def collect_async(router):
+    async def collect():
+        return [chunk async for chunk in router.stream_async("diet", "age:30")]
+    return asyncio.run(collect())
+
+
+def test_async_stream_falls_back_before_the_first_chunk():
+    models = {'primary': FakeModel(error=RuntimeError("quota")), 'backup': FakeModel("backup plan")}
+    assert "".join(collect_async(router_for(models))) == "backup plan"
+
+
+def test_async_stream_raises_when_all_models_fail():
+    models = {'primary': FakeModel(error=RuntimeError("quota")), 'backup': FakeModel(error=RuntimeError("down"))}
+    with pytest.raises(RuntimeError, match="All models failed"):
+        collect_async(router_for(models))
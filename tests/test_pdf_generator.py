@@ -0,0 +1,56 @@
+import pytest
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.platypus import Paragraph
+
+import pdf_generator
+import planner
+from plan_store import SQLitePlanRepository
+
+
+def test_user_details_escape_markup():
+    info = pdf_generator.personal_info_for(planner.DEFAULT_USER_DATA, "<b>Bob & Co")
+    details = pdf_generator.format_user_details(info)
+    assert "&lt;b&gt;Bob &amp; Co" in details
+    # Would raise a ValueError for unbalanced markup
+    Paragraph(details, getSampleStyleSheet()['Normal'])
+
+
+def test_personal_info_defaults_name():
+    assert pdf_generator.personal_info_for(planner.DEFAULT_USER_DATA)['name'] == "User"
+
+
+@pytest.fixture
+def rendered(tmp_path, monkeypatch):
+    calls = []
+
+    def fake_generate(kind, diet_plan, workout_plan, user_details):
+        calls.append((kind, diet_plan, workout_plan))
+        path = tmp_path / f"{kind}_{len(calls)}.pdf"
+        path.write_bytes(b"%PDF")
+        return str(path)
+
+    monkeypatch.setattr(pdf_generator, "generate_plan_pdf", fake_generate)
+    return calls
+
+
+@pytest.fixture
+def repository(tmp_path):
+    repository = SQLitePlanRepository(str(tmp_path / "plans.db"))
+    repository.save_plan("abc", "diet", "diet plan")
+    repository.save_plan("abc", "workout", "workout plan")
+    return repository
+
+
+def test_cached_plan_pdf_reuses_identical_exports(repository, rendered):
+    first = pdf_generator.cached_plan_pdf(repository, "diet", 1, 2, "details")
+    # The workout plan is not part of a diet PDF, so a different one still hits the cache
+    assert pdf_generator.cached_plan_pdf(repository, "diet", 1, 3, "details") == first
+    assert rendered == [("diet", "diet plan", None)]
+    pdf_generator.cached_plan_pdf(repository, "diet", 1, 2, "other details")
+    assert len(rendered) == 2
+
+
+def test_render_plan_pdf_is_not_cached(repository, rendered):
+    pdf_generator.render_plan_pdf(repository, "combined", 1, 2, "details")
+    pdf_generator.render_plan_pdf(repository, "combined", 1, 2, "details")
+    assert rendered == [("combined", "diet plan", "workout plan")] * 2
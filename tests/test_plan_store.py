@@ -0,0 +1,90 @@
+import sqlite3
+
+import pytest
+
+import plan_store
+from plan_store import PlanRepository, SQLitePlanRepository, profile_hash
+
+
+@pytest.fixture
+def repository(tmp_path):
+    return SQLitePlanRepository(str(tmp_path / "nested" / "plans.db"))
+
+
+def test_plan_round_trip_is_compressed(repository):
+    text = "**Day 1**\n" + "Oats with berries (450 calories)\n" * 200
+    plan_id = repository.save_plan("abc", "diet", text)
+    assert repository.load_plan(plan_id) == text
+    assert repository.load_plan(plan_id + 1) is None
+
+    conn = sqlite3.connect(repository.path)
+    stored = conn.execute("SELECT content FROM plans WHERE id = ?", (plan_id,)).fetchone()[0]
+    conn.close()
+    assert len(stored) < len(text)
+
+
+def test_find_plan_id_returns_newest_per_type(repository):
+    assert repository.find_plan_id("abc", "diet") is None
+    repository.save_plan("abc", "diet", "old")
+    newest = repository.save_plan("abc", "diet", "new")
+    workout = repository.save_plan("abc", "workout", "run")
+    assert repository.find_plan_id("abc", "diet") == newest
+    assert repository.find_plan_id("abc", "workout") == workout
+    assert repository.find_plan_id("other", "diet") is None
+
+
+def test_history_is_newest_first_and_per_user(repository):
+    diet_id = repository.save_plan("abc", "diet", "diet")
+    workout_id = repository.save_plan("abc", "workout", "workout")
+    first = repository.create_plan_set("alice", "abc", {'diet_goal': "Weight Loss"}, diet_id, workout_id)
+    second = repository.create_plan_set("alice", "abc", {'diet_goal': "Weight Gain"}, diet_id, workout_id)
+    repository.create_plan_set("bob", "abc", {}, diet_id, workout_id)
+
+    history = repository.history("alice")
+    assert [plan_set['id'] for plan_set in history] == [second, first]
+    assert history[0]['personal_info'] == {'diet_goal': "Weight Gain"}
+    assert history[0]['diet_plan_id'] == diet_id
+    assert repository.history("alice", limit=1) == history[:1]
+    assert repository.latest_plan_set("alice") == history[0]
+    assert repository.latest_plan_set("carol") is None
+    assert repository.get_plan_set(first)['user_id'] == "alice"
+
+
+def test_pdf_paths(repository):
+    assert repository.get_pdf_path(1, "diet") is None
+    repository.save_pdf_path(1, "diet", "a.pdf")
+    repository.save_pdf_path(1, "diet", "b.pdf")
+    assert repository.get_pdf_path(1, "diet") == "b.pdf"
+
+    assert repository.get_cached_pdf("key") is None
+    repository.save_cached_pdf("key", "c.pdf")
+    assert repository.get_cached_pdf("key") == "c.pdf"
+
+
+def test_request_log(repository):
+    popular = {'age': 30, 'gender': "Male"}
+    rare = {'age': 40, 'gender': "Female"}
+    for user_data in (popular, rare, popular):
+        repository.log_request(profile_hash(user_data), user_data)
+
+    assert repository.popular_profiles(1) == [(popular, 2)]
+    assert repository.get_profile(profile_hash(rare)) == rare
+    assert repository.get_profile("missing") is None
+    assert repository.request_counts() == {profile_hash(popular): 2, profile_hash(rare): 1}
+
+
+def test_profile_hash_ignores_key_order():
+    assert profile_hash({'a': 1, 'b': 2}) == profile_hash({'b': 2, 'a': 1})
+    assert profile_hash({'a': 1}) != profile_hash({'a': 2})
+
+
+def test_repository_interface_is_abstract():
+    with pytest.raises(TypeError):
+        PlanRepository()
+
+
+def test_get_repository_rejects_unknown_backend(tmp_path, monkeypatch):
+    monkeypatch.setenv("PLAN_STORE_PATH", str(tmp_path / "plans.db"))
+    assert isinstance(plan_store.get_repository(), SQLitePlanRepository)
+    with pytest.raises(ValueError):
+        plan_store.get_repository("postgres")
@@ -0,0 +1,133 @@
+import threading
+import time
+
+import pytest
+
+import speculative
+from speculative import SpeculativePrefetcher
+
+
+class FakeRepository:
+    def find_plan_id(self, profile_hash, plan_type):
+        return None
+
+
+@pytest.fixture
+def generated(monkeypatch):
+    profiles = []
+    monkeypatch.setattr(speculative, "generate_missing_plans",
+                        lambda repository, user_data: profiles.append(user_data))
+    return profiles
+
+
+def test_settled_inputs_are_generated(generated):
+    prefetcher = SpeculativePrefetcher(FakeRepository(), debounce_seconds=0.05)
+    prefetcher.schedule("session", {'age': 30})
+    time.sleep(0.3)
+    assert generated == [{'age': 30}]
+
+
+def test_changed_inputs_replace_the_pending_profile(generated):
+    prefetcher = SpeculativePrefetcher(FakeRepository(), debounce_seconds=0.1)
+    prefetcher.schedule("session", {'age': 30})
+    prefetcher.schedule("session", {'age': 31})
+    time.sleep(0.4)
+    assert generated == [{'age': 31}]
+
+
+def test_cancel_drops_the_pending_profile(generated):
+    prefetcher = SpeculativePrefetcher(FakeRepository(), debounce_seconds=0.1)
+    prefetcher.schedule("session", {'age': 30})
+    prefetcher.cancel("session")
+    prefetcher.cancel("other-session")
+    time.sleep(0.3)
+    assert generated == []
+
+
+def test_hourly_budget(generated):
+    prefetcher = SpeculativePrefetcher(FakeRepository(), debounce_seconds=0.01, max_per_hour=1)
+    prefetcher.schedule("a", {'age': 30})
+    prefetcher.schedule("b", {'age': 40})
+    time.sleep(0.3)
+    assert len(generated) == 1
+
+
+def test_settings_are_read_from_the_environment(monkeypatch):
+    monkeypatch.setenv("SPECULATIVE_PREFETCH", "yes")
+    monkeypatch.setenv("SPECULATIVE_DEBOUNCE_SECONDS", "1.5")
+    assert speculative.enabled()
+    assert SpeculativePrefetcher(FakeRepository()).debounce_seconds == 1.5
+    monkeypatch.delenv("SPECULATIVE_PREFETCH")
+    assert not speculative.enabled()
+
+
+@pytest.fixture
+def slow_generation(monkeypatch):
+    """Generations that run until released, recording each profile when it starts"""
+    started = []
+    release = threading.Event()
+
+    def generate(repository, user_data):
+        started.append(user_data)
+        release.wait(5)
+
+    monkeypatch.setattr(speculative, "generate_missing_plans", generate)
+    yield started, release
+    release.set()
+
+
+def wait_for(condition, seconds=1.0):
+    deadline = time.monotonic() + seconds
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_claim_waits_for_a_running_generation(slow_generation):
+    started, release = slow_generation
+    prefetcher = SpeculativePrefetcher(FakeRepository(), debounce_seconds=0.01)
+    prefetcher.schedule("session", {'age': 30})
+    assert wait_for(lambda: started)
+    threading.Timer(0.1, release.set).start()
+    assert prefetcher.claim("session", {'age': 30}, timeout=2)
+
+
+def test_claim_cancels_a_queued_generation(slow_generation):
+    started, release = slow_generation
+    prefetcher = SpeculativePrefetcher(FakeRepository(), debounce_seconds=0.01, max_workers=1)
+    prefetcher.schedule("a", {'age': 30})
+    assert wait_for(lambda: started)
+    prefetcher.schedule("b", {'age': 40})
+    assert wait_for(lambda: len(prefetcher._futures) == 2)
+
+    began = time.monotonic()
+    assert not prefetcher.claim("c", {'age': 40})
+    assert time.monotonic() - began < 0.1
+    release.set()
+    time.sleep(0.1)
+    assert started == [{'age': 30}]
+    # The cancelled run never called the model, so it is refunded from the budget
+    assert len(prefetcher._started) == 1
+
+
+def test_claim_without_a_generation():
+    prefetcher = SpeculativePrefetcher(FakeRepository(), debounce_seconds=1)
+    prefetcher.schedule("session", {'age': 30})
+    assert not prefetcher.claim("session", {'age': 30})
+    assert prefetcher._timers == {}
+
+
+def test_changed_inputs_cancel_a_queued_generation(slow_generation):
+    started, release = slow_generation
+    prefetcher = SpeculativePrefetcher(FakeRepository(), debounce_seconds=0.01, max_workers=1)
+    prefetcher.schedule("a", {'age': 30})
+    assert wait_for(lambda: started)
+    prefetcher.schedule("b", {'age': 40})
+    assert wait_for(lambda: len(prefetcher._futures) == 2)
+
+    prefetcher.schedule("b", {'age': 41})
+    assert wait_for(lambda: len(prefetcher._futures) == 1)
+    release.set()
+    assert wait_for(lambda: len(started) == 2)
+    time.sleep(0.1)
+    assert started == [{'age': 30}, {'age': 41}]
@@ -0,0 +1,56 @@
+import pytest
+
+import planner
+import warmup
+from plan_store import SQLitePlanRepository, profile_hash
+
+
+@pytest.fixture
+def repository(tmp_path):
+    repository = SQLitePlanRepository(str(tmp_path / "plans.db"))
+    user_data = dict(planner.DEFAULT_USER_DATA, age=45)
+    for _ in range(2):
+        repository.log_request(profile_hash(user_data), user_data)
+    return repository
+
+
+def test_default_selection_uses_the_request_log_only(repository):
+    logged, enumerated = warmup.select_profiles(repository, limit=10)
+    assert [user_data['age'] for user_data in logged] == [45]
+    assert enumerated == []
+
+
+def test_enumerate_tops_up_to_the_limit(repository):
+    logged, enumerated = warmup.select_profiles(repository, limit=10, enumerate_all=True)
+    assert len(logged) == 1
+    assert len(enumerated) == 9
+    # Closest to the sidebar defaults first
+    assert enumerated[0] == planner.DEFAULT_USER_DATA
+
+
+def test_enumerated_profiles_only_vary_choice_fields():
+    profiles = warmup.enumerate_profiles()
+    varied = {key for profile in profiles for key, value in profile.items()
+              if value != planner.DEFAULT_USER_DATA[key]}
+    assert varied == {'activity_level', 'diet_goal', 'fitness_goal', 'dietary_restrictions',
+                      'exercise_experience'}
+    assert len({profile_hash(profile) for profile in profiles}) == len(profiles)
+
+
+@pytest.mark.parametrize("value, window", [("1-6", (1, 6)), ("22-30", (22, 6))])
+def test_parse_window(value, window):
+    assert warmup.parse_window(value) == window
+
+
+def test_in_window_wraps_midnight(monkeypatch):
+    class FakeDatetime:
+        @staticmethod
+        def now():
+            class Now:
+                hour = 23
+            return Now
+
+    monkeypatch.setattr(warmup, "datetime", FakeDatetime)
+    assert warmup.in_window((22, 6))
+    assert not warmup.in_window((1, 6))
+    assert warmup.in_window(None)
@@ -0,0 +1,175 @@
+"""Pre-generate plans and PDFs for popular profiles so they are served from cache.
+
+Run during off-peak hours, e.g. from cron:
+
+    python warmup.py --limit 300 --workers 4 --window 1-6
+"""
+import argparse
+import itertools
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+from dotenv import load_dotenv
+
+import planner
+from pdf_generator import PLAN_PDF_KINDS, cached_plan_pdf, format_user_details, personal_info_for
+from plan_store import PLAN_TYPES, get_repository, profile_hash
+from speculative import generate_missing_plans
+
+
+def enumerate_profiles():
+    """All sidebar choice combinations, with every other input at its default
+
+    Profiles closest to the sidebar defaults come first, since most users
+    only change a few fields.
+    """
+    defaults = planner.DEFAULT_USER_DATA
+    choices = [
+        ('activity_level', planner.ACTIVITY_LEVELS),
+        ('diet_goal', planner.DIET_GOALS),
+        ('fitness_goal', planner.FITNESS_GOALS),
+        ('dietary_restrictions', planner.DIET_TYPES),
+        ('exercise_experience', planner.EXPERIENCE_LEVELS),
+    ]
+    profiles = []
+    for values in itertools.product(*(options for _, options in choices)):
+        profile = dict(defaults)
+        profile.update(zip((key for key, _ in choices), values))
+        profiles.append(profile)
+    return sorted(profiles, key=lambda profile: sum(profile[key] != defaults[key] for key, _ in choices))
+
+
+def select_profiles(repository, limit, enumerate_all=False):
+    """Return (logged, enumerated) profiles to warm
+
+    Logged profiles are the most requested ones from the request log. With
+    enumerate_all they are topped up to the limit with enumerated combinations,
+    which only match users who leave every other sidebar field at its default.
+    """
+    logged = {profile_hash(user_data): user_data for user_data, _ in repository.popular_profiles(limit)}
+    enumerated = {}
+    if enumerate_all:
+        for user_data in enumerate_profiles():
+            if len(logged) + len(enumerated) >= limit:
+                break
+            key = profile_hash(user_data)
+            if key not in logged:
+                enumerated[key] = user_data
+    return list(logged.values()), list(enumerated.values())
+
+
+def is_warm(repository, key):
+    """True if both plans for the profile hash are already stored"""
+    return all(repository.find_plan_id(key, plan_type) is not None for plan_type in PLAN_TYPES)
+
+
+def cached_count(repository, profiles):
+    """Number of the given profiles whose plans are fully cached"""
+    return sum(is_warm(repository, profile_hash(user_data)) for user_data in profiles)
+
+
+def in_window(window):
+    """True if the current hour is inside an (start, end) off-peak window, which may wrap midnight"""
+    if window is None:
+        return True
+    start, end = window
+    hour = datetime.now().hour
+    return start <= hour < end if start <= end else hour >= start or hour < end
+
+
+def warm_profile(repository, user_data, window):
+    """Generate both plans and the default-name PDFs for one profile"""
+    # Checked per job so a long run stops submitting work once peak hours begin
+    if not in_window(window):
+        return False
+    generate_missing_plans(repository, user_data)
+    key = profile_hash(user_data)
+    diet_plan_id = repository.find_plan_id(key, "diet")
+    workout_plan_id = repository.find_plan_id(key, "workout")
+    # Users who leave the name empty get exactly these exports
+    user_details = format_user_details(personal_info_for(user_data))
+    for kind in PLAN_PDF_KINDS:
+        cached_plan_pdf(repository, kind, diet_plan_id, workout_plan_id, user_details)
+    return True
+
+
+def expected_hit_rate(repository):
+    """Share of logged requests whose profile is now fully cached, or None without a log"""
+    counts = repository.request_counts()
+    total = sum(counts.values())
+    if not total:
+        return None
+    return sum(count for key, count in counts.items() if is_warm(repository, key)) / total
+
+
+def parse_window(value):
+    """Parse an 'START-END' hour range such as '1-6'"""
+    start, end = (int(hour) for hour in value.split('-'))
+    return start % 24, end % 24
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pre-generate plans and PDFs for popular profiles")
+    parser.add_argument("--limit", type=int, default=300, help="Number of profiles to warm")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent generations")
+    parser.add_argument("--enumerate", action="store_true", dest="enumerate_all",
+                        help="Top up the request log with enumerated sidebar combinations "
+                             "(every other field at its default)")
+    parser.add_argument("--window", type=parse_window, default=None,
+                        help="Only start work between these hours, e.g. 1-6")
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    api_key = os.getenv("GOOGLE_API_KEY")
+    if not api_key:
+        print("GOOGLE_API_KEY is not set", file=sys.stderr)
+        return 1
+    planner.configure(api_key)
+    max_model_calls = planner.get_router().max_workers
+    if args.workers > max_model_calls:
+        print(f"Note: only {max_model_calls} model calls run at once; raise MODEL_MAX_WORKERS "
+              f"to use {args.workers} workers", file=sys.stderr)
+
+    repository = get_repository()
+    logged, enumerated = select_profiles(repository, args.limit, args.enumerate_all)
+    profiles = logged + enumerated
+    if not profiles:
+        print("Request log is empty; nothing to warm (use --enumerate to warm sidebar combinations)")
+        return 0
+    pending = [user_data for user_data in profiles if not is_warm(repository, profile_hash(user_data))]
+    print(f"{len(logged)} logged and {len(enumerated)} enumerated profiles selected, "
+          f"{len(profiles) - len(pending)} already cached")
+
+    warmed = skipped = failed = 0
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        futures = [executor.submit(warm_profile, repository, user_data, args.window) for user_data in pending]
+        for future in as_completed(futures):
+            try:
+                if future.result():
+                    warmed += 1
+                else:
+                    skipped += 1
+            except Exception as e:
+                failed += 1
+                print(f"Warm-up failed: {e}", file=sys.stderr)
+
+    print(f"Warmed {warmed}, skipped {skipped} (outside window), failed {failed}")
+    if logged:
+        cached = cached_count(repository, logged)
+        print(f"Coverage: {cached}/{len(logged)} logged profiles cached ({cached / len(logged):.1%})")
+    if enumerated:
+        # Reported separately: these rarely match a real request exactly
+        cached = cached_count(repository, enumerated)
+        print(f"Enumerated: {cached}/{len(enumerated)} profiles cached")
+    hit_rate = expected_hit_rate(repository)
+    if hit_rate is None:
+        print("Expected hit rate: n/a (request log is empty)")
+    else:
+        print(f"Expected hit rate: {hit_rate:.1%} of logged requests")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())